@@ -72,12 +72,16 @@ def show(execution_id, model_storage, logger):
 @aria.options.service_name(required=False)
 @aria.options.sort_by()
 @aria.options.descending
+@aria.options.page_size()
+@aria.options.cursor
 @aria.options.verbose()
 @aria.pass_model_storage
 @aria.pass_logger
 def list(service_name,
          sort_by,
          descending,
+         page_size,
+         cursor,
          model_storage,
          logger):
     """List executions
@@ -96,9 +100,11 @@ def list(service_name,
 
     executions_list = model_storage.execution.list(
         filters=filters,
-        sort=utils.storage_sort_param(sort_by, descending)).items
+        sort=utils.storage_sort_param(sort_by, descending),
+        pagination=utils.storage_pagination_param(page_size, cursor))
 
-    table.print_data(EXECUTION_COLUMNS, executions_list, 'Executions:')
+    table.print_data(EXECUTION_COLUMNS, executions_list.items, 'Executions:')
+    utils.log_next_page(logger, executions_list)
 
 
 @executions.command(name='start',
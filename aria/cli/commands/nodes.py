@@ -59,12 +59,16 @@ def show(node_id, model_storage, logger):
 @aria.options.service_name(required=False)
 @aria.options.sort_by('service_name')
 @aria.options.descending
+@aria.options.page_size()
+@aria.options.cursor
 @aria.options.verbose()
 @aria.pass_model_storage
 @aria.pass_logger
 def list(service_name,
          sort_by,
          descending,
+         page_size,
+         cursor,
          model_storage,
          logger):
     """List nodes
@@ -82,6 +86,8 @@ def list(service_name,
 
     nodes_list = model_storage.node.list(
         filters=filters,
-        sort=utils.storage_sort_param(sort_by, descending))
+        sort=utils.storage_sort_param(sort_by, descending),
+        pagination=utils.storage_pagination_param(page_size, cursor))
 
     table.print_data(NODE_COLUMNS, nodes_list, 'Nodes:')
+    utils.log_next_page(logger, nodes_list)
@@ -340,6 +340,11 @@ class Options(object):
             default=defaults.SORT_DESCENDING,
             help=helptexts.DESCENDING)
 
+        self.cursor = click.option(
+            '--cursor',
+            required=False,
+            help=helptexts.CURSOR)
+
         self.service_template_filename = click.option(
             '-n',
             '--service-template-filename',
@@ -450,6 +455,15 @@ class Options(object):
             default=default,
             help=helptexts.SORT_BY)
 
+    @staticmethod
+    def page_size(default=None):
+        return click.option(
+            '--page-size',
+            type=int,
+            required=False,
+            default=default,
+            help=helptexts.PAGE_SIZE)
+
     @staticmethod
     def task_retry_interval(default=defaults.TASK_RETRY_INTERVAL):
         return click.option(
@@ -24,6 +24,9 @@ MEDIUM_VERBOSE = 2
 LOW_VERBOSE = 1
 NO_VERBOSE = 0
 
+# The number of logs read from storage at once
+LOGS_PAGE_SIZE = 1000
+
 LOGGER_CONFIG_TEMPLATE = {
     "version": 1,
     "formatters": {
@@ -115,17 +118,32 @@ class Logging(object):
 
 class ModelLogIterator(object):
 
-    def __init__(self, model_storage, execution_id, filters=None, sort=None):
+    def __init__(self, model_storage, execution_id, filters=None, sort=None,
+                 page_size=LOGS_PAGE_SIZE):
         self._last_visited_id = 0
         self._model_storage = model_storage
         self._execution_id = execution_id
         self._additional_filters = filters or {}
         self._sort = sort or {}
+        self._page_size = page_size
 
     def __iter__(self):
         filters = dict(execution_fk=self._execution_id, id=dict(gt=self._last_visited_id))
         filters.update(self._additional_filters)
 
-        for log in self._model_storage.log.iter(filters=filters, sort=self._sort):
-            self._last_visited_id = log.id
-            yield log
+        # Logs are read a page at a time, each starting where the previous one ended, so that
+        # executions with many logs are neither loaded at once nor scanned from their start
+        cursor = None
+        while True:
+            # The task of every log is printed along with it
+            logs_list = self._model_storage.log.list(
+                filters=filters,
+                sort=self._sort,
+                pagination=dict(size=self._page_size, cursor=cursor),
+                load={'task': 'joined'})
+            for log in logs_list:
+                self._last_visited_id = log.id
+                yield log
+            cursor = logs_list.metadata['cursor']
+            if cursor is None:
+                return
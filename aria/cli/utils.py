@@ -28,6 +28,18 @@ def storage_sort_param(sort_by, descending):
     return {sort_by: 'desc' if descending else 'asc'}
 
 
+def storage_pagination_param(page_size, cursor):
+    if page_size is None and cursor is None:
+        return None
+    return dict(size=page_size or 0, cursor=cursor)
+
+
+def log_next_page(logger, list_result):
+    cursor = (list_result.metadata or {}).get('cursor')
+    if cursor:
+        logger.info('There are more items, list them with --cursor {0}'.format(cursor))
+
+
 def get_parameter_templates_as_string(parameter_templates):
     params_string = StringIO()
 
@@ -68,30 +68,32 @@ class Core(object):
         # creating an empty ConsumptionContext, initiating a threadlocal context
         context = consumption.ConsumptionContext()
 
-        storage_session = self.model_storage._all_api_kwargs['session']
-        # setting no autoflush for the duration of instantiation - this helps avoid dependency
-        # constraints as they're being set up
-        with storage_session.no_autoflush:
-            service = service_template.instantiate(None, self.model_storage, inputs=inputs)
-
-            consumption.ConsumerChain(
-                context,
-                (
-                    consumption.CoerceServiceInstanceValues,
-                    consumption.ValidateServiceInstance,
-                    consumption.SatisfyRequirements,
-                    consumption.CoerceServiceInstanceValues,
-                    consumption.ValidateCapabilities,
-                    consumption.FindHosts,
-                    consumption.ConfigureOperations,
-                    consumption.CoerceServiceInstanceValues
-                )).consume()
-            if context.validation.dump_issues():
-                raise exceptions.InstantiationError('Failed to instantiate service template')
-
-        storage_session.flush()  # flushing so service.id would auto-populate
-        service.name = service_name or '{0}_{1}'.format(service_template.name, service.id)
-        self.model_storage.service.put(service)
+        # the service and all its instances are committed in a single transaction
+        with self.model_storage.transaction():
+            storage_session = self.model_storage._all_api_kwargs['session']
+            # setting no autoflush for the duration of instantiation - this helps avoid dependency
+            # constraints as they're being set up
+            with storage_session.no_autoflush:
+                service = service_template.instantiate(None, self.model_storage, inputs=inputs)
+
+                consumption.ConsumerChain(
+                    context,
+                    (
+                        consumption.CoerceServiceInstanceValues,
+                        consumption.ValidateServiceInstance,
+                        consumption.SatisfyRequirements,
+                        consumption.CoerceServiceInstanceValues,
+                        consumption.ValidateCapabilities,
+                        consumption.FindHosts,
+                        consumption.ConfigureOperations,
+                        consumption.CoerceServiceInstanceValues
+                    )).consume()
+                if context.validation.dump_issues():
+                    raise exceptions.InstantiationError('Failed to instantiate service template')
+
+            storage_session.flush()  # flushing so service.id would auto-populate
+            service.name = service_name or '{0}_{1}'.format(service_template.name, service.id)
+            self.model_storage.service.put(service)
         return service
 
     def delete_service(self, service_id, force=False):
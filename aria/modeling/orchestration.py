@@ -33,6 +33,7 @@ from sqlalchemy import (
     Enum,
     String,
     Float,
+    Index,
     orm,
 )
 from sqlalchemy.ext.associationproxy import association_proxy
@@ -56,6 +57,11 @@ class ExecutionBase(ModelMixin):
     __private_fields__ = ['service_fk',
                           'service_template']
 
+    @declared_attr
+    def __table_args__(cls):
+        # The executions of a service
+        return (Index('ix_execution_service_fk', 'service_fk'), )
+
     SUCCEEDED = 'succeeded'
     FAILED = 'failed'
     CANCELLED = 'cancelled'
@@ -262,6 +268,11 @@ class TaskBase(ModelMixin):
                           'plugin_fk',
                           'execution_fk']
 
+    @declared_attr
+    def __table_args__(cls):
+        # The tasks of an execution, by their status
+        return (Index('ix_task_execution_fk_status', 'execution_fk', 'status'), )
+
     PENDING = 'pending'
     RETRYING = 'retrying'
     SENT = 'sent'
@@ -276,6 +287,8 @@ class TaskBase(ModelMixin):
         SUCCESS,
         FAILED,
     )
+    END_STATES = (SUCCESS, FAILED)
+    WAIT_STATES = (PENDING, RETRYING)
 
     INFINITE_RETRIES = -1
 
@@ -316,10 +329,10 @@ class TaskBase(ModelMixin):
     attempts_count = Column(Integer, default=1)
 
     def has_ended(self):
-        return self.status in (self.SUCCESS, self.FAILED)
+        return self.status in self.END_STATES
 
     def is_waiting(self):
-        return self.status in (self.PENDING, self.RETRYING)
+        return self.status in self.WAIT_STATES
 
     @property
     def actor(self):
@@ -400,6 +413,11 @@ class LogBase(ModelMixin):
     __private_fields__ = ['execution_fk',
                           'task_fk']
 
+    @declared_attr
+    def __table_args__(cls):
+        # The logs of an execution which follow a given log (see ``ModelLogIterator``)
+        return (Index('ix_log_execution_fk_id', 'execution_fk', 'id'), )
+
     @declared_attr
     def execution(cls):
         return relationship.many_to_one(cls, 'execution')
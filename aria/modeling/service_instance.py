@@ -20,7 +20,8 @@ from sqlalchemy import (
     Text,
     Integer,
     Enum,
-    Boolean
+    Boolean,
+    Index
 )
 from sqlalchemy import DateTime
 from sqlalchemy.ext.associationproxy import association_proxy
@@ -360,6 +361,11 @@ class NodeBase(InstanceModelMixin):
                           'service_fk',
                           'node_template_fk']
 
+    @declared_attr
+    def __table_args__(cls):
+        # The nodes of a service, and a node of a service by its name
+        return (Index('ix_node_service_fk_name', 'service_fk', 'name'), )
+
     INITIAL = 'initial'
     CREATING = 'creating'
     CREATED = 'created'
@@ -91,9 +91,11 @@ class BaseOperationContext(BaseContext):
 
     @classmethod
     def deserialize_from_dict(cls, model_storage=None, resource_storage=None, **kwargs):
-        if model_storage:
+        # Storages which were already created (e.g. by a pooled process executor worker) may be
+        # passed instead of their serialization dicts
+        if isinstance(model_storage, dict):
             model_storage = aria.application_model_storage(**model_storage)
-        if resource_storage:
+        if isinstance(resource_storage, dict):
             resource_storage = aria.application_resource_storage(**resource_storage)
 
         return cls(model_storage=model_storage, resource_storage=resource_storage, **kwargs)
@@ -23,6 +23,16 @@ from contextlib import contextmanager
 from .exceptions import ContextException
 from .common import BaseContext
 
+# The relationships of the nodes which workflows build their task graphs from (their operations and
+# their relationships to other nodes), loaded together with the nodes rather than node by node
+NODES_LOAD = {
+    'interfaces': 'subquery',
+    'interfaces.operations': 'subquery',
+    'outbound_relationships': 'subquery',
+    'outbound_relationships.interfaces': 'subquery',
+    'outbound_relationships.interfaces.operations': 'subquery',
+}
+
 
 class WorkflowContext(BaseContext):
     """
@@ -34,6 +44,9 @@ class WorkflowContext(BaseContext):
                  task_max_attempts=1,
                  task_retry_interval=0,
                  task_ignore_failure=False,
+                 task_retry_policy=None,
+                 interface_retry_policies=None,
+                 task_retry_budget=None,
                  *args, **kwargs):
         super(WorkflowContext, self).__init__(*args, **kwargs)
         self._workflow_name = workflow_name
@@ -41,6 +54,9 @@ class WorkflowContext(BaseContext):
         self._task_max_attempts = task_max_attempts
         self._task_retry_interval = task_retry_interval
         self._task_ignore_failure = task_ignore_failure
+        self._task_retry_policy = task_retry_policy
+        self._interface_retry_policies = interface_retry_policies or {}
+        self._task_retry_budget = task_retry_budget
         self._register_logger()
 
     def __repr__(self):
@@ -89,7 +105,8 @@ class WorkflowContext(BaseContext):
         return self.model.node.iter(
             filters={
                 key: getattr(self.service, self.service.name_column_name())
-            }
+            },
+            load=NODES_LOAD
         )
 
 
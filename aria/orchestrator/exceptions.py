@@ -74,3 +74,11 @@ class WorkflowImplementationNotFoundError(AriaError):
     Raised when attempting to import a workflow's code but the implementation is not found
     """
     pass
+
+
+class ExecutionNotResumableError(AriaError):
+    """
+    Raised when attempting to resume an execution which has ended, or which belongs to another
+    service
+    """
+    pass
@@ -86,18 +86,23 @@ class PluginManager(object):
 
         # Update PYTHONPATH environment variable to include plugin's site-packages
         # directories
+        process_utils.append_to_pythonpath(*self.get_plugin_pythonpath_dirs(plugin), env=env)
+
+    def get_plugin_pythonpath_dirs(self, plugin):
+        """
+        The directories the plugin's python packages are installed in
+        """
+        plugin_dir = self.get_plugin_dir(plugin)
         if _IS_WIN:
-            pythonpath_dirs = [os.path.join(plugin_dir, 'Lib', 'site-packages')]
+            return [os.path.join(plugin_dir, 'Lib', 'site-packages')]
         else:
             # In some linux environments, there will be both a lib and a lib64 directory
             # with the latter, containing compiled packages.
-            pythonpath_dirs = [os.path.join(
+            return [os.path.join(
                 plugin_dir, 'lib{0}'.format(b),
                 'python{0}.{1}'.format(sys.version_info[0], sys.version_info[1]),
                 'site-packages') for b in ('', '64')]
 
-        process_utils.append_to_pythonpath(*pythonpath_dirs, env=env)
-
     def get_plugin_dir(self, plugin):
         return os.path.join(
             self._plugins_dir,
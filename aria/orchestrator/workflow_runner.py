@@ -24,6 +24,8 @@ from datetime import datetime
 from . import exceptions
 from .context.workflow import WorkflowContext
 from .workflows import builtin
+from .workflows.api.task_graph_cache import TaskGraphCache
+from .workflows.core import retry
 from .workflows.core.engine import Engine
 from .workflows.executor.process import ProcessExecutor
 from ..modeling import models
@@ -34,13 +36,18 @@ from ..utils.imports import import_fullname
 DEFAULT_TASK_MAX_ATTEMPTS = 30
 DEFAULT_TASK_RETRY_INTERVAL = 30
 
+# The graphs of the built-in workflows only depend on the service topology, so they are cached
+BUILTIN_WORKFLOWS_GRAPH_CACHE = TaskGraphCache()
+
 
 class WorkflowRunner(object):
 
     def __init__(self, workflow_name, service_id, inputs,
                  model_storage, resource_storage, plugin_manager,
                  executor=None, task_max_attempts=DEFAULT_TASK_MAX_ATTEMPTS,
-                 task_retry_interval=DEFAULT_TASK_RETRY_INTERVAL):
+                 task_retry_interval=DEFAULT_TASK_RETRY_INTERVAL, concurrency_limits=None,
+                 execution_id=None, task_retry_policy=None, interface_retry_policies=None,
+                 task_retry_budget=None):
         """
         Manages a single workflow execution on a given service
         :param workflow_name: Workflow name
@@ -52,6 +59,18 @@ class WorkflowRunner(object):
         :param executor: Executor for tasks. Defaults to a ProcessExecutor instance.
         :param task_max_attempts: Maximum attempts of repeating each failing task
         :param task_retry_interval: Retry interval in between retry attempts of a failing task
+        :param concurrency_limits: Limits of the tasks executed at once (see
+                                   ``aria.orchestrator.workflows.core.scheduler.ConcurrencyLimits``)
+        :param execution_id: Id of an interrupted execution to resume. The workflow of the execution
+                             is executed again with the execution's inputs (``workflow_name`` and
+                             ``inputs`` are ignored), but the tasks which have already succeeded are
+                             not executed again. Tasks which failed are attempted again.
+        :param task_retry_policy: Retry policy of failing tasks (see
+                                  ``aria.orchestrator.workflows.core.retry``). Defaults to retrying
+                                  every ``task_retry_interval`` seconds.
+        :param interface_retry_policies: A dict of interface name to the retry policy of its
+                                         operations, overriding ``task_retry_policy``
+        :param task_retry_budget: Maximum number of retries of all the tasks of the execution
         """
 
         self._model_storage = model_storage
@@ -62,11 +81,14 @@ class WorkflowRunner(object):
         # by several threads without raising errors on model objects shared between threads
         self._service_id = service_id
 
-        self._validate_workflow_exists_for_service()
-
-        workflow_fn = self._get_workflow_fn()
-
-        execution = self._create_execution_model(inputs)
+        if execution_id is None:
+            self._validate_workflow_exists_for_service()
+            workflow_fn = self._get_workflow_fn()
+            execution = self._create_execution_model(inputs)
+        else:
+            execution = self._get_resumable_execution(execution_id)
+            self._workflow_name = execution.workflow_name
+            workflow_fn = self._get_workflow_fn()
         self._execution_id = execution.id
 
         workflow_context = WorkflowContext(
@@ -75,19 +97,29 @@ class WorkflowRunner(object):
             resource_storage=resource_storage,
             service_id=service_id,
             execution_id=execution.id,
-            workflow_name=workflow_name,
+            workflow_name=self._workflow_name,
             task_max_attempts=task_max_attempts,
-            task_retry_interval=task_retry_interval)
+            task_retry_interval=task_retry_interval,
+            task_retry_policy=task_retry_policy,
+            interface_retry_policies=interface_retry_policies,
+            task_retry_budget=(retry.RetryBudget(task_retry_budget)
+                               if task_retry_budget is not None else None))
 
         # transforming the execution inputs to dict, to pass them to the workflow function
         execution_inputs_dict = dict(inp.unwrap() for inp in self.execution.inputs.values())
-        self._tasks_graph = workflow_fn(ctx=workflow_context, **execution_inputs_dict)
+        if self._workflow_name in builtin.BUILTIN_WORKFLOWS:
+            self._tasks_graph = BUILTIN_WORKFLOWS_GRAPH_CACHE.build(
+                workflow_name=self._workflow_name, workflow_fn=workflow_fn, ctx=workflow_context)
+        else:
+            self._tasks_graph = workflow_fn(ctx=workflow_context, **execution_inputs_dict)
 
         executor = executor or ProcessExecutor(plugin_manager=plugin_manager)
         self._engine = Engine(
             executor=executor,
             workflow_context=workflow_context,
-            tasks_graph=self._tasks_graph)
+            tasks_graph=self._tasks_graph,
+            concurrency_limits=concurrency_limits,
+            resume=execution_id is not None)
 
     @property
     def execution_id(self):
@@ -104,6 +136,15 @@ class WorkflowRunner(object):
     def execute(self):
         self._engine.execute()
 
+    def simulate(self, durations=None, concurrency_limits=None, seed=None):
+        """
+        Predicts the execution of the workflow without executing it (see
+        ``aria.orchestrator.workflows.core.engine.Engine.simulate``)
+        """
+        return self._engine.simulate(durations=durations,
+                                     concurrency_limits=concurrency_limits,
+                                     seed=seed)
+
     def cancel(self):
         self._engine.cancel_execution()
 
@@ -125,6 +166,15 @@ class WorkflowRunner(object):
         self._model_storage.execution.put(execution)
         return execution
 
+    def _get_resumable_execution(self, execution_id):
+        execution = self._model_storage.execution.get(execution_id)
+        if execution.service.id != self._service_id or execution.has_ended():
+            raise exceptions.ExecutionNotResumableError(
+                "Can't resume execution {0}; It has ended or does not belong to service {1}"
+                .format(execution_id, self.service.name))
+        self._validate_no_active_executions(execution)
+        return execution
+
     def _validate_workflow_exists_for_service(self):
         if self._workflow_name not in self.service.workflows and \
                         self._workflow_name not in builtin.BUILTIN_WORKFLOWS:
@@ -133,7 +183,8 @@ class WorkflowRunner(object):
                 .format(self._workflow_name, self.service.name))
 
     def _validate_no_active_executions(self, execution):
-        active_executions = [e for e in self.service.executions if e.is_active()]
+        active_executions = [e for e in self.service.executions
+                             if e.is_active() and e.id != execution.id]
         if active_executions:
             raise exceptions.ActiveExecutionsError(
                 "Can't start execution; Service {0} has an active execution with id {1}"
@@ -17,4 +17,4 @@
 Provides API for building tasks
 """
 
-from . import task, task_graph
+from . import task, task_graph, task_graph_cache
@@ -67,10 +67,14 @@ class OperationTask(BaseTask):
                  inputs=None,
                  max_attempts=None,
                  retry_interval=None,
-                 ignore_failure=None):
+                 ignore_failure=None,
+                 retry_policy=None):
         """
         Do not call this constructor directly. Instead, use :meth:`for_node` or
         :meth:`for_relationship`.
+        :param retry_policy: :class:`aria.orchestrator.workflows.core.retry.RetryPolicy` deciding
+                             the intervals between retries. Defaults to the policy of the interface
+                             in the workflow context, if any, and otherwise to ``retry_interval``.
         """
         assert isinstance(actor, (models.Node, models.Relationship))
         super(OperationTask, self).__init__()
@@ -79,6 +83,8 @@ class OperationTask(BaseTask):
         self.operation_name = operation_name
         self.max_attempts = max_attempts or self.workflow_context._task_max_attempts
         self.retry_interval = retry_interval or self.workflow_context._task_retry_interval
+        self.retry_policy = retry_policy or self.workflow_context._interface_retry_policies.get(
+            interface_name, self.workflow_context._task_retry_policy)
         self.ignore_failure = \
             self.workflow_context._task_ignore_failure if ignore_failure is None else ignore_failure
         self.name = OperationTask.NAME_FORMAT.format(type=type(actor).__name__.lower(),
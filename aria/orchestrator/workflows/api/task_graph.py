@@ -51,6 +51,8 @@ class TaskGraph(object):
         self.name = name
         self._id = generate_uuid(variant='uuid')
         self._graph = DiGraph()
+        # The topological sort of the graph, which is kept until the graph is modified
+        self._topological_order = None
 
     def __repr__(self):
         return '{name}(id={self._id}, name={self.name}, graph={self._graph!r})'.format(
@@ -81,8 +83,10 @@ class TaskGraph(object):
         :param reverse: whether to reverse the sort
         :return: a list which represents the topological sort
         """
-        for task_id in topological_sort(self._graph, reverse=reverse):
-            yield self.get_task(task_id)
+        if self._topological_order is None:
+            self._topological_order = [self._graph.node[task_id]['task']
+                                       for task_id in topological_sort(self._graph)]
+        return iter(reversed(self._topological_order) if reverse else self._topological_order)
 
     def get_dependencies(self, dependent_task):
         """
@@ -91,10 +95,10 @@ class TaskGraph(object):
         :yields: Iterator over all tasks which dependency_task depends on
         :raise: TaskNotInGraphError if dependent_task is not in the graph
         """
-        if not self.has_tasks(dependent_task):
+        if not self._graph.has_node(dependent_task.id):
             raise TaskNotInGraphError('Task id: {0}'.format(dependent_task.id))
-        for _, dependency_id in self._graph.out_edges_iter(dependent_task.id):
-            yield self.get_task(dependency_id)
+        for dependency_id in self._graph.successors_iter(dependent_task.id):
+            yield self._graph.node[dependency_id]['task']
 
     def get_dependents(self, dependency_task):
         """
@@ -103,10 +107,10 @@ class TaskGraph(object):
         :yields: Iterator over all tasks which depend on dependency_task
         :raise: TaskNotInGraphError if dependency_task is not in the graph
         """
-        if not self.has_tasks(dependency_task):
+        if not self._graph.has_node(dependency_task.id):
             raise TaskNotInGraphError('Task id: {0}'.format(dependency_task.id))
-        for dependent_id, _ in self._graph.in_edges_iter(dependency_task.id):
-            yield self.get_task(dependent_id)
+        for dependent_id in self._graph.predecessors_iter(dependency_task.id):
+            yield self._graph.node[dependent_id]['task']
 
     # task methods
 
@@ -137,8 +141,9 @@ class TaskGraph(object):
         for task in tasks:
             if isinstance(task, Iterable):
                 return_tasks += self.add_tasks(*task)
-            elif not self.has_tasks(task):
+            elif not self._graph.has_node(task.id):
                 self._graph.add_node(task.id, task=task)
+                self._topological_order = None
                 return_tasks.append(task)
 
         return return_tasks
@@ -156,8 +161,9 @@ class TaskGraph(object):
         for task in tasks:
             if isinstance(task, Iterable):
                 return_tasks += self.remove_tasks(*task)
-            elif self.has_tasks(task):
+            elif self._graph.has_node(task.id):
                 self._graph.remove_node(task.id)
+                self._topological_order = None
                 return_tasks.append(task)
 
         return return_tasks
@@ -194,21 +200,38 @@ class TaskGraph(object):
         :raise TaskNotInGraphError if either the dependent or dependency are tasks which
          are not in the graph
         """
-        if not (self.has_tasks(dependent) and self.has_tasks(dependency)):
-            raise TaskNotInGraphError()
-
-        if self.has_dependency(dependent, dependency):
-            return
+        self.add_dependencies([(dependent, dependency)])
 
-        if isinstance(dependent, Iterable):
-            for dependent_task in dependent:
-                self.add_dependency(dependent_task, dependency)
+    def add_dependencies(self, dependencies):
+        """
+        Add several dependencies at once (see :meth:`add_dependency`)
+        :param dependencies: an iterable of (dependent, dependency) pairs, where each item is a
+                             task, sequence or parallel
+        :raise TaskNotInGraphError if any of the dependents or dependencies are tasks which are not
+         in the graph
+        """
+        edges = []
+        for dependent, dependency in dependencies:
+            dependency_ids = list(self._task_ids(dependency))
+            edges.extend((dependent_id, dependency_id)
+                         for dependent_id in self._task_ids(dependent)
+                         for dependency_id in dependency_ids)
+        self._graph.add_edges_from(edges)
+        self._topological_order = None
+
+    def _task_ids(self, item):
+        """
+        The ids of a task, or of the tasks of a sequence or parallel
+        :raise TaskNotInGraphError if any of the tasks is not in the graph
+        """
+        if isinstance(item, Iterable):
+            for task in item:
+                for task_id in self._task_ids(task):
+                    yield task_id
+        elif not self._graph.has_node(item.id):
+            raise TaskNotInGraphError('Task id: {0}'.format(item.id))
         else:
-            if isinstance(dependency, Iterable):
-                for dependency_task in dependency:
-                    self.add_dependency(dependent, dependency_task)
-            else:
-                self._graph.add_edge(dependent.id, dependency.id)
+            yield item.id
 
     def has_dependency(self, dependent, dependency):
         """
@@ -273,6 +296,7 @@ class TaskGraph(object):
                 self.remove_dependency(dependent, dependency_task)
         else:
             self._graph.remove_edge(dependent.id, dependency.id)
+            self._topological_order = None
 
     @_filter_out_empty_tasks
     def sequence(self, *tasks):
@@ -283,8 +307,6 @@ class TaskGraph(object):
         """
         if tasks:
             self.add_tasks(*tasks)
-
-            for i in xrange(1, len(tasks)):
-                self.add_dependency(tasks[i], tasks[i-1])
+            self.add_dependencies((tasks[i], tasks[i-1]) for i in xrange(1, len(tasks)))
 
         return tasks
@@ -0,0 +1,193 @@
+# Licensed to the Apache Software Foundation (ASF) under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Caching of the task graphs built by workflows
+"""
+
+import hashlib
+import threading
+
+from ... import context
+from ....modeling import models
+from ....utils.collections import OrderedDict
+from . import task as api_task
+from .task_graph import TaskGraph
+
+
+class TaskGraphCache(object):
+    """
+    Caches the structure of the task graphs built by workflows, so that building the graph of a
+    workflow again does not require running the workflow function.
+
+    A cached structure is kept per service and workflow, along with a digest of the topology of the
+    service it was built for (its nodes, relationships and their operations) and the task defaults
+    of the workflow context. Once either changes, the graph is built by the workflow function again.
+    Therefore, only workflows which take no inputs, and whose graph depends on nothing but the
+    topology of the service (e.g. the built-in workflows), should be built through the cache.
+
+    The least recently used structures are dropped once more than ``max_size`` are cached.
+    """
+
+    def __init__(self, max_size=128):
+        """
+        :param max_size: the maximal number of cached structures
+        """
+        self._max_size = max_size
+        self._skeletons = OrderedDict()
+        self._lock = threading.Lock()
+
+    def build(self, workflow_name, workflow_fn, ctx):
+        """
+        Builds the task graph of a workflow, using the cached structure if possible
+        :param workflow_name: the name of the workflow
+        :param workflow_fn: the workflow function, called if the graph is not cached
+        :param ctx: the workflow context
+        :return: the task graph
+        """
+        key = (ctx.service.id, workflow_name)
+        version = (_topology_digest(ctx), _task_defaults(ctx))
+        with self._lock:
+            cached = self._skeletons.pop(key, None)
+            if cached is not None and cached[0] == version:
+                # Marks the structure as the most recently used one
+                self._skeletons[key] = cached
+            else:
+                cached = None
+        if cached is not None:
+            with context.workflow.current.push(ctx):
+                return _restore(cached[1], ctx, _load_actors(ctx))
+
+        graph = workflow_fn(ctx=ctx)
+        with self._lock:
+            self._skeletons.pop(key, None)
+            self._skeletons[key] = (version, _skeleton(graph))
+            while len(self._skeletons) > self._max_size:
+                self._skeletons.popitem(last=False)
+        return graph
+
+    def clear(self):
+        """
+        Removes all cached graphs
+        """
+        with self._lock:
+            self._skeletons.clear()
+
+
+def _topology_digest(ctx):
+    """
+    Digests the nodes and relationships of the service and the names of their operations. Only
+    columns are queried, so no model instances are loaded.
+    """
+    session = ctx.model.node._session
+    service_id = ctx.service.id
+    node, relationship = models.Node, models.Relationship
+    interface, operation = models.Interface, models.Operation
+
+    nodes = session.query(node.id, node.name).filter(node.service_fk == service_id)
+    relationships = session.query(relationship.id, relationship.source_node_fk,
+                                  relationship.target_node_fk) \
+        .join(node, relationship.source_node_fk == node.id) \
+        .filter(node.service_fk == service_id)
+    node_operations = session.query(interface.node_fk, interface.name, operation.name) \
+        .join(operation, operation.interface_fk == interface.id) \
+        .join(node, interface.node_fk == node.id) \
+        .filter(node.service_fk == service_id)
+    relationship_operations = session.query(interface.relationship_fk, interface.name,
+                                            operation.name) \
+        .join(operation, operation.interface_fk == interface.id) \
+        .join(relationship, interface.relationship_fk == relationship.id) \
+        .join(node, relationship.source_node_fk == node.id) \
+        .filter(node.service_fk == service_id)
+
+    digest = hashlib.sha1()
+    for query in (nodes, relationships, node_operations, relationship_operations):
+        digest.update(repr(sorted(tuple(row) for row in query)))
+        digest.update('\0')
+    return digest.hexdigest()
+
+
+def _load_actors(ctx):
+    """
+    :return: dict of the service actors (nodes and relationships) by their key
+    """
+    actors = {}
+    for node in ctx.nodes:
+        actors[_actor_key(node)] = node
+        for relationship in node.outbound_relationships:
+            actors[_actor_key(relationship)] = relationship
+    return actors
+
+
+def _task_defaults(ctx):
+    # Retry policies compare by value
+    return (ctx._task_max_attempts, ctx._task_retry_interval, ctx._task_ignore_failure,
+            ctx._task_retry_policy,
+            tuple(sorted(ctx._interface_retry_policies.items())))
+
+
+def _actor_key(actor):
+    return 'node' if isinstance(actor, models.Node) else 'relationship', actor.id
+
+
+def _skeleton(graph):
+    """
+    Describes the structure of a task graph, without referring to any model instances
+    """
+    tasks = list(graph.tasks)
+    indices = dict((task.id, index) for index, task in enumerate(tasks))
+    entries = []
+    for task in tasks:
+        if isinstance(task, api_task.OperationTask):
+            entries.append(('operation', _actor_key(task.actor), task.interface_name,
+                            task.operation_name, task.max_attempts, task.retry_interval,
+                            task.ignore_failure, task.retry_policy))
+        elif isinstance(task, api_task.WorkflowTask):
+            entries.append(('workflow', _skeleton(task.graph)))
+        else:
+            entries.append(('stub', ))
+    edges = [(indices[task.id], indices[dependency.id])
+             for task in tasks for dependency in graph.get_dependencies(task)]
+    return graph.name, entries, edges
+
+
+def _restore(skeleton, ctx, actors):
+    name, entries, edges = skeleton
+    graph = TaskGraph(name)
+    tasks = []
+    for entry in entries:
+        if entry[0] == 'operation':
+            actor_key, interface_name, operation_name, max_attempts, retry_interval, \
+                ignore_failure, retry_policy = entry[1:]
+            tasks.append(api_task.OperationTask(actors[actor_key],
+                                                interface_name=interface_name,
+                                                operation_name=operation_name,
+                                                max_attempts=max_attempts,
+                                                retry_interval=retry_interval,
+                                                ignore_failure=ignore_failure,
+                                                retry_policy=retry_policy))
+        elif entry[0] == 'workflow':
+            tasks.append(api_task.WorkflowTask(_constant_workflow(_restore(entry[1], ctx, actors)),
+                                               ctx=ctx))
+        else:
+            tasks.append(api_task.StubTask(ctx=ctx))
+    if tasks:
+        graph.add_tasks(*tasks)
+    graph.add_dependencies((tasks[dependent], tasks[dependency]) for dependent, dependency in edges)
+    return graph
+
+
+def _constant_workflow(graph):
+    return lambda **_: graph
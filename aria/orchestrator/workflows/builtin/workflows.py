@@ -129,21 +129,15 @@ def create_node_task_dependencies(graph, tasks_and_nodes, reverse=False):
     Creates dependencies between tasks if there is a relationship (outbound) between their nodes.
     """
 
-    def get_task(node_name):
-        for api_task, task_node in tasks_and_nodes:
-            if task_node.name == node_name:
-                return api_task
-        return None
+    tasks_by_node_name = dict((node.name, api_task) for api_task, node in tasks_and_nodes)
 
+    graph_dependencies = []
     for api_task, node in tasks_and_nodes:
-        dependencies = []
         for relationship in node.outbound_relationships:
-            dependency = get_task(relationship.target_node.name)
+            dependency = tasks_by_node_name.get(relationship.target_node.name)
             if dependency:
-                dependencies.append(dependency)
-        if dependencies:
-            if reverse:
-                for dependency in dependencies:
-                    graph.add_dependency(dependency, api_task)
-            else:
-                graph.add_dependency(api_task, dependencies)
+                if reverse:
+                    graph_dependencies.append((dependency, api_task))
+                else:
+                    graph_dependencies.append((api_task, dependency))
+    graph.add_dependencies(graph_dependencies)
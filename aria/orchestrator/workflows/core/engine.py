@@ -18,6 +18,7 @@ The workflow engine. Executes workflows
 """
 
 import time
+import Queue
 from datetime import datetime
 
 import networkx
@@ -28,43 +29,79 @@ from aria.orchestrator import events
 
 from .. import exceptions
 from . import task as engine_task
+from . import scheduler
+from . import simulation
 from . import translation
 # Import required so all signals are registered
 from . import events_handler  # pylint: disable=unused-import
 
 
+# The longest time (in seconds) the engine waits for a task event before re-examining the
+# execution graph. This only matters for state changes which are not reported by an executor (e.g.
+# an execution cancelled by another process).
+MAX_EVENT_WAIT_INTERVAL = 1
+
+
 class Engine(logger.LoggerMixin):
     """
     The workflow engine. Executes workflows
     """
 
-    def __init__(self, executor, workflow_context, tasks_graph, **kwargs):
+    def __init__(self, executor, workflow_context, tasks_graph, concurrency_limits=None,
+                 resume=False, **kwargs):
+        """
+        :param concurrency_limits: optional :class:`scheduler.ConcurrencyLimits` of the tasks
+                                   executed at once
+        :param resume: whether the execution was interrupted, in which case the stored tasks of the
+                       execution are used, and the tasks which have succeeded are not executed
+                       again
+        """
         super(Engine, self).__init__(**kwargs)
         self._workflow_context = workflow_context
         self._execution_graph = networkx.DiGraph()
+        # Executors report task state changes through signals, which are pushed onto this
+        # queue in order to wake up the engine loop
+        self._events = Queue.Queue()
+        # Cancel requests made through this engine are noticed without reading the execution
+        self._cancel_requested = False
+        self._last_cancel_check = None
         translation.build_execution_graph(task_graph=tasks_graph,
                                           execution_graph=self._execution_graph,
-                                          default_executor=executor)
+                                          default_executor=executor,
+                                          resume=resume)
+        self._concurrency_limits = concurrency_limits
+        self._history = simulation.historical_durations(
+            self._workflow_context.model, [task.name for task in self._operation_tasks()])
+        self._scheduler = scheduler.Scheduler(self._execution_graph,
+                                              limits=concurrency_limits,
+                                              weights=self._expected_durations())
 
     def execute(self):
         """
         execute the workflow
         """
+        events.task_state_changed_signal.connect(self._task_state_changed)
         try:
             events.start_workflow_signal.send(self._workflow_context)
             while True:
                 cancel = self._is_cancel()
                 if cancel:
                     break
+                progressed = False
                 for task in self._ended_tasks():
                     self._handle_ended_tasks(task)
+                    progressed = True
                 for task in self._executable_tasks():
                     self._handle_executable_task(task)
+                    progressed = True
                 if self._all_tasks_consumed():
                     break
-                else:
-                    time.sleep(0.1)
+                elif not progressed:
+                    # Tasks handled in this iteration (e.g. stub tasks) may have already changed
+                    # their state, so the engine only waits when nothing happened
+                    self._wait_for_events()
             if cancel:
+                self._terminate_in_flight_tasks()
                 events.on_cancelled_workflow_signal.send(self._workflow_context)
             else:
                 events.on_success_workflow_signal.send(self._workflow_context)
@@ -72,6 +109,30 @@ class Engine(logger.LoggerMixin):
 
             events.on_failure_workflow_signal.send(self._workflow_context, exception=e)
             raise
+        finally:
+            events.task_state_changed_signal.disconnect(self._task_state_changed)
+            # Tasks which are still running are no longer followed by the engine
+            for task in self._scheduler.in_flight_tasks:
+                self._flush_task_state(task, write_behind=False)
+
+    def simulate(self, durations=None, concurrency_limits=None, seed=None):
+        """
+        Predicts the execution of the workflow on a virtual clock, without executing any task (see
+        :func:`simulation.simulate`). Operations without a duration distribution take as long as
+        they took in the past, or as long as an average past task.
+        :param durations: dict of duration distributions, by task name or by (interface name,
+                          operation name)
+        :param concurrency_limits: :class:`scheduler.ConcurrencyLimits` to simulate. Defaults to
+                                   the limits of the engine.
+        :param seed: seed of the random choices, for reproducible simulations
+        :return: :class:`simulation.SimulationResult`
+        """
+        return simulation.simulate(self._execution_graph,
+                                   durations=durations,
+                                   history=self._history,
+                                   limits=concurrency_limits or self._concurrency_limits,
+                                   default_duration=self._default_duration(),
+                                   seed=seed)
 
     def cancel_execution(self):
         """
@@ -80,43 +141,112 @@ class Engine(logger.LoggerMixin):
         will be modified to 'cancelled' directly.
         """
         events.on_cancelling_workflow_signal.send(self._workflow_context)
+        self._cancel_requested = True
+        self._events.put(None)
+
+    def _task_state_changed(self, task, **kwargs):
+        if self._execution_graph.has_node(task.id):
+            self._events.put(task.id)
+
+    def _wait_for_events(self):
+        """
+        Blocks until a task changes its state, or until the nearest due date of a waiting task
+        """
+        try:
+            self._events.get(timeout=self._wait_interval())
+        except Queue.Empty:
+            return
+        # Several events may have piled up, a single scan of the graph handles all of them
+        while True:
+            try:
+                self._events.get_nowait()
+            except Queue.Empty:
+                return
+
+    def _wait_interval(self):
+        interval = MAX_EVENT_WAIT_INTERVAL
+        next_due_at = self._scheduler.next_due_at
+        if next_due_at is not None:
+            # timedelta.total_seconds is not available on Python 2.6
+            delta = next_due_at - datetime.utcnow()
+            interval = min(interval, delta.days * 86400 + delta.seconds + delta.microseconds / 1e6)
+        return max(interval, 0)
+
+    def _operation_tasks(self):
+        return [data['task'] for _, data in self._execution_graph.nodes_iter(data=True)
+                if isinstance(data['task'], engine_task.OperationTask)]
+
+    def _expected_durations(self):
+        """
+        Estimates the duration of every operation task by the durations of past successful tasks
+        of the same name (i.e. the same operation of the same actor)
+        :return: dict of task id to its expected duration in seconds
+        """
+        default_duration = self._default_duration()
+        return dict((task.id, _mean(self._history[task.name]) if self._history.get(task.name)
+                     else default_duration)
+                    for task in self._operation_tasks())
+
+    def _default_duration(self):
+        # Tasks without history are expected to take as long as an average task
+        means = [_mean(values) for values in self._history.values() if values]
+        return _mean(means) if means else 1
 
     def _is_cancel(self):
+        if self._cancel_requested:
+            return True
+        # Executions may also be cancelled by other processes, in which case the request is only
+        # found in storage. It is read at most once per MAX_EVENT_WAIT_INTERVAL.
+        now = time.time()
+        if self._last_cancel_check is not None and \
+                now - self._last_cancel_check < MAX_EVENT_WAIT_INTERVAL:
+            return False
+        self._last_cancel_check = now
         return self._workflow_context.execution.status in (models.Execution.CANCELLING,
                                                            models.Execution.CANCELLED)
 
+    def _terminate_in_flight_tasks(self):
+        for task in self._scheduler.in_flight_tasks:
+            task.terminate()
+
     def _executable_tasks(self):
-        now = datetime.utcnow()
-        return (task for task in self._tasks_iter()
-                if task.is_waiting() and
-                task.due_at <= now and
-                not self._task_has_dependencies(task))
+        return self._scheduler.ready_tasks()
 
     def _ended_tasks(self):
-        return (task for task in self._tasks_iter() if task.has_ended())
-
-    def _task_has_dependencies(self, task):
-        return len(self._execution_graph.pred.get(task.id, {})) > 0
+        for task in self._scheduler.in_flight_tasks:
+            # The task state is kept in memory and updated by the executors, so there is no need
+            # to read it from storage. Changes are written to storage as the engine handles them.
+            self._flush_task_state(task)
+            if task.has_ended():
+                yield task
+            elif task.is_waiting():
+                # The task has failed, and will be executed again once it is due
+                self._scheduler.task_retrying(task)
 
     def _all_tasks_consumed(self):
-        return len(self._execution_graph.node) == 0
-
-    def _tasks_iter(self):
-        for _, data in self._execution_graph.nodes_iter(data=True):
-            task = data['task']
-            if isinstance(task, engine_task.OperationTask):
-                if not task.model_task.has_ended():
-                    self._workflow_context.model.task.refresh(task.model_task)
-            yield task
+        return self._scheduler.all_tasks_consumed()
 
-    @staticmethod
-    def _handle_executable_task(task):
+    def _handle_executable_task(self, task):
+        if task.has_ended():
+            # A task of a resumed execution, which ended before the execution was interrupted
+            return
         if isinstance(task, engine_task.OperationTask):
             events.sent_task_signal.send(task)
+            # Executed operations may read their task from storage
+            self._flush_task_state(task)
         task.execute()
 
+    @staticmethod
+    def _flush_task_state(task, **kwargs):
+        if isinstance(task, engine_task.OperationTask):
+            task.flush(**kwargs)
+
     def _handle_ended_tasks(self, task):
         if task.status == models.Task.FAILED and not task.ignore_failure:
             raise exceptions.ExecutorException('Workflow failed')
         else:
-            self._execution_graph.remove_node(task.id)
+            self._scheduler.task_ended(task)
+
+
+def _mean(values):
+    return float(sum(values)) / len(values)
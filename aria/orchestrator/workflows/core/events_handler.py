@@ -25,6 +25,7 @@ from datetime import (
     timedelta,
 )
 
+from ....modeling import models
 from ... import events
 from ... import exceptions
 
@@ -40,7 +41,7 @@ def _task_started(task, *args, **kwargs):
     with task._update():
         task.started_at = datetime.utcnow()
         task.status = task.STARTED
-    _update_node_state_if_necessary(task, is_transitional=True)
+        _update_node_state_if_necessary(task, is_transitional=True)
 
 
 @events.on_failure_task_signal.connect
@@ -55,11 +56,12 @@ def _task_failed(task, exception, *args, **kwargs):
             not task.ignore_failure
         ])
         if should_retry:
-            retry_interval = None
-            if isinstance(exception, exceptions.TaskRetryException):
-                retry_interval = exception.retry_interval
-            if retry_interval is None:
-                retry_interval = task.retry_interval
+            # The retry budget is only spent by tasks which would otherwise be retried
+            retry_budget = task._workflow_context._task_retry_budget
+            should_retry = retry_budget is None or retry_budget.consume()
+        if should_retry:
+            retry_interval = _retry_interval(task, exception)
+            task.last_retry_interval = retry_interval
             task.status = task.RETRYING
             task.attempts_count += 1
             task.due_at = datetime.utcnow() + timedelta(seconds=retry_interval)
@@ -68,13 +70,22 @@ def _task_failed(task, exception, *args, **kwargs):
             task.status = task.FAILED
 
 
+def _retry_interval(task, exception):
+    if isinstance(exception, exceptions.TaskRetryException) and \
+            exception.retry_interval is not None:
+        return exception.retry_interval
+    if task.retry_policy is None:
+        return task.retry_interval
+    return task.retry_policy.interval(attempt=task.attempts_count,
+                                      previous_interval=task.last_retry_interval)
+
+
 @events.on_success_task_signal.connect
 def _task_succeeded(task, *args, **kwargs):
     with task._update():
         task.ended_at = datetime.utcnow()
         task.status = task.SUCCESS
-
-    _update_node_state_if_necessary(task)
+        _update_node_state_if_necessary(task)
 
 
 @events.start_workflow_signal.connect
@@ -134,16 +145,18 @@ def _workflow_cancelling(workflow_context, *args, **kwargs):
 
 
 def _update_node_state_if_necessary(task, is_transitional=False):
+    """
+    Sets the node state which results from the task, which is written along with the task state.
+    Must be called while the task is in update mode.
+    """
     # TODO: this is not the right way to check! the interface name is arbitrary
     # and also will *never* be the type name
-    model_task = task.model_task
-    node = model_task.node if model_task is not None else None
-    if (node is not None) and \
+    if (task.node_fk is not None) and \
         (task.interface_name in ('Standard', 'tosca.interfaces.node.lifecycle.Standard')):
-        state = node.determine_state(op_name=task.operation_name, is_transitional=is_transitional)
+        state = models.Node.determine_state(op_name=task.operation_name,
+                                            is_transitional=is_transitional)
         if state:
-            node.state = state
-            task.context.model.node.update(node)
+            task.node_state = state
 
 
 def _log_tried_to_cancel_execution_but_it_already_ended(workflow_context, status):
@@ -0,0 +1,151 @@
+# Licensed to the Apache Software Foundation (ASF) under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Retry policies of failing tasks
+"""
+
+import math
+import random
+import threading
+
+
+class RetryPolicy(object):
+    """
+    Decides how long a failing task waits before it is executed again
+    """
+
+    def interval(self, attempt, previous_interval=None):
+        """
+        :param attempt: the number of the attempt which has failed (starting from 1)
+        :param previous_interval: the interval returned for the previous attempt, or None if this
+                                  is the first retry of the task
+        :return: the retry interval in seconds
+        """
+        raise NotImplementedError
+
+    # Policies of the same type and parameters are equal, so they can be compared and hashed by
+    # value (e.g. by the cache of task graphs)
+
+    def __eq__(self, other):
+        return type(self) is type(other) and vars(self) == vars(other)
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash((type(self), tuple(sorted(vars(self).items()))))
+
+
+class FixedRetryPolicy(RetryPolicy):
+    """
+    Waits the same interval before every retry
+    """
+
+    def __init__(self, retry_interval):
+        self.retry_interval = retry_interval
+
+    def interval(self, attempt, previous_interval=None):
+        return self.retry_interval
+
+
+class ExponentialRetryPolicy(RetryPolicy):
+    """
+    Multiplies the interval by a constant factor on every retry, up to a maximal interval.
+
+    With jitter, the interval is picked at random between zero and the exponential interval, so
+    tasks which failed together are not retried together.
+    """
+
+    def __init__(self, base_interval, factor=2, max_interval=None, jitter=False):
+        """
+        :param base_interval: the interval before the first retry
+        :param factor: the factor by which the interval grows on every retry
+        :param max_interval: the longest interval, or None for no limit
+        :param jitter: whether to randomize the interval
+        """
+        self.base_interval = base_interval
+        self.factor = factor
+        self.max_interval = max_interval
+        self.jitter = jitter
+
+    def interval(self, attempt, previous_interval=None):
+        exponent = attempt - 1
+        if self.max_interval is not None and self.factor > 1 and self.base_interval > 0:
+            # Stops growing the interval once it reaches the maximal interval, so it does not
+            # overflow after many retries
+            exponent = min(exponent, max(0, int(math.ceil(
+                math.log(float(self.max_interval) / self.base_interval, self.factor)))))
+        interval = self.base_interval * self.factor ** exponent
+        if self.max_interval is not None:
+            interval = min(interval, self.max_interval)
+        if self.jitter:
+            interval = random.uniform(0, interval)
+        return interval
+
+
+class DecorrelatedJitterRetryPolicy(RetryPolicy):
+    """
+    Picks the interval at random between the base interval and three times the previous interval,
+    up to a maximal interval. Intervals grow about as fast as exponential ones, while tasks which
+    failed together quickly spread apart.
+    """
+
+    def __init__(self, base_interval, max_interval):
+        """
+        :param base_interval: the shortest interval
+        :param max_interval: the longest interval
+        """
+        self.base_interval = base_interval
+        self.max_interval = max_interval
+
+    def interval(self, attempt, previous_interval=None):
+        previous_interval = previous_interval or self.base_interval
+        return min(self.max_interval,
+                   random.uniform(self.base_interval, previous_interval * 3))
+
+
+class RetryBudget(object):
+    """
+    Limits the number of retries of all the tasks of an execution. Once the budget is spent,
+    failing tasks are no longer retried, even if they have attempts left.
+    """
+
+    def __init__(self, max_retries):
+        """
+        :param max_retries: the number of retries allowed throughout the execution
+        """
+        self.max_retries = max_retries
+        self._retries = 0
+        # Task failures are reported by executors from their own threads
+        self._lock = threading.Lock()
+
+    @property
+    def remaining(self):
+        """
+        The number of retries left
+        """
+        return max(self.max_retries - self._retries, 0)
+
+    def consume(self):
+        """
+        Spends a single retry of the budget
+        :return: whether the budget allowed the retry
+        """
+        with self._lock:
+            if self._retries >= self.max_retries:
+                return False
+            self._retries += 1
+            return True
@@ -0,0 +1,230 @@
+# Licensed to the Apache Software Foundation (ASF) under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Scheduling of the execution graph tasks
+"""
+
+import heapq
+import itertools
+from collections import defaultdict
+from datetime import datetime
+
+import networkx
+
+
+class ConcurrencyLimits(object):
+    """
+    Limits the number of tasks which are executed at once.
+
+    Only tasks with an implementation are limited, as other tasks (e.g. stub tasks) are not
+    executed by an executor. Limits which are not provided are not enforced.
+    """
+
+    def __init__(self,
+                 max_tasks=None,
+                 max_tasks_per_plugin=None,
+                 max_tasks_per_host=None,
+                 max_tasks_per_interface=None):
+        """
+        :param max_tasks: maximum number of tasks executed at once
+        :param max_tasks_per_plugin: maximum number of tasks of the same plugin executed at once
+        :param max_tasks_per_host: maximum number of tasks of the same host node executed at once
+        :param max_tasks_per_interface: maximum number of tasks of the same interface executed at
+                                        once
+        """
+        self.max_tasks = max_tasks
+        # Task attributes by which tasks are grouped, and the limit of each group
+        self._group_limits = [(attribute, limit) for attribute, limit in (
+            ('plugin_fk', max_tasks_per_plugin),
+            ('host_fk', max_tasks_per_host),
+            ('interface_name', max_tasks_per_interface)) if limit is not None]
+        self._tasks_count = 0
+        self._group_counts = defaultdict(int)
+
+    @property
+    def saturated(self):
+        """
+        Whether no more tasks can be executed until some of the executed tasks end
+        """
+        return self.max_tasks is not None and self._tasks_count >= self.max_tasks
+
+    def acquire(self, task):
+        """
+        Counts a task as executed, if it does not exceed any of the limits
+        :return: whether the task can be executed
+        """
+        if not self._is_limited(task):
+            return True
+        groups = list(self._groups(task))
+        if self.saturated or any(self._group_counts[group] >= limit for group, limit in groups):
+            return False
+        self._tasks_count += 1
+        for group, _ in groups:
+            self._group_counts[group] += 1
+        return True
+
+    def release(self, task):
+        """
+        Stops counting a task which was acquired as executed
+        """
+        if not self._is_limited(task):
+            return
+        self._tasks_count -= 1
+        for group, _ in self._groups(task):
+            self._group_counts[group] -= 1
+
+    @staticmethod
+    def _is_limited(task):
+        return bool(getattr(task, 'implementation', None))
+
+    def _groups(self, task):
+        for attribute, limit in self._group_limits:
+            value = getattr(task, attribute, None)
+            # Tasks which do not belong to a group (e.g. tasks without a plugin) are not limited
+            if value is not None:
+                yield (attribute, value), limit
+
+
+class Scheduler(object):
+    """
+    Keeps track of the execution graph tasks which are ready to be executed.
+
+    The number of unfinished dependencies (in-degree) of every task is computed once, and is
+    decremented for the dependents of each task that ends. Tasks whose counter drops to zero are
+    put in a ready queue, while tasks waiting for a retry are kept in a heap ordered by their due
+    date. Picking the next tasks to execute thus never requires scanning the whole graph.
+
+    Ready tasks are handed out by their priority, which is the length of the longest path from the
+    task to the end of the graph (the critical path), weighted by the expected duration of every
+    task. This way, tasks which many others wait for are executed first.
+
+    If concurrency limits are provided, ready tasks which exceed them are kept in the ready queue
+    until enough of the tasks in flight end.
+    """
+
+    def __init__(self, execution_graph, limits=None, weights=None):
+        """
+        :param execution_graph: the execution graph
+        :param limits: :class:`ConcurrencyLimits` of the tasks in flight
+        :param weights: dict of task id to the expected duration of the task. Tasks which are
+                        missing are considered to take no time.
+        """
+        self._execution_graph = execution_graph
+        self._limits = limits
+        self._priorities = self._critical_path_lengths(execution_graph, weights or {})
+        self._indegree = execution_graph.in_degree()
+        self._ready = []
+        self._retries = []
+        # Breaks ties between tasks of the same priority, or which are due at the same time
+        self._counter = itertools.count()
+        self._in_flight = {}
+        self._remaining = len(self._indegree)
+
+        for task_id, indegree in self._indegree.items():
+            if indegree == 0:
+                self._enqueue(self._get_task(task_id))
+
+    @property
+    def in_flight_tasks(self):
+        """
+        The tasks which were handed out for execution and have not ended yet
+        :return: list of tasks
+        """
+        return self._in_flight.values()
+
+    @property
+    def next_due_at(self):
+        """
+        The nearest due date of a task waiting for a retry
+        :return: datetime or None if no task is waiting for a retry
+        """
+        return self._retries[0][0] if self._retries else None
+
+    def all_tasks_consumed(self):
+        """
+        Whether all the tasks in the execution graph have ended
+        """
+        return self._remaining == 0
+
+    def ready_tasks(self, now=None):
+        """
+        Iterates over the tasks which can be executed. Each yielded task is considered in flight
+        until either :meth:`task_ended` or :meth:`task_retrying` is called for it.
+        :param now: the time against which retry due dates are compared
+        :yields: tasks ready for execution
+        """
+        now = now or datetime.utcnow()
+        while self._retries and self._retries[0][0] <= now:
+            self._push_ready(heapq.heappop(self._retries)[-1])
+        throttled = []
+        try:
+            while self._ready:
+                entry = heapq.heappop(self._ready)
+                task = entry[-1]
+                if self._limits and not self._limits.acquire(task):
+                    throttled.append(entry)
+                    continue
+                self._in_flight[task.id] = task
+                yield task
+        finally:
+            # Throttled tasks keep their priority
+            for entry in throttled:
+                heapq.heappush(self._ready, entry)
+
+    def task_ended(self, task):
+        """
+        Marks a task as ended, releasing the dependents which do not wait for other tasks
+        """
+        del self._in_flight[task.id]
+        self._release(task)
+        self._remaining -= 1
+        for dependent_id in self._execution_graph.successors_iter(task.id):
+            self._indegree[dependent_id] -= 1
+            if self._indegree[dependent_id] == 0:
+                self._enqueue(self._get_task(dependent_id))
+
+    def task_retrying(self, task):
+        """
+        Marks a task as waiting to be executed again once it is due
+        """
+        del self._in_flight[task.id]
+        self._release(task)
+        self._enqueue(task)
+
+    def _release(self, task):
+        if self._limits:
+            self._limits.release(task)
+
+    def _enqueue(self, task):
+        if task.due_at <= datetime.utcnow():
+            self._push_ready(task)
+        else:
+            heapq.heappush(self._retries, (task.due_at, next(self._counter), task))
+
+    def _push_ready(self, task):
+        heapq.heappush(self._ready, (-self._priorities[task.id], next(self._counter), task))
+
+    @staticmethod
+    def _critical_path_lengths(execution_graph, weights):
+        lengths = {}
+        for task_id in networkx.topological_sort(execution_graph, reverse=True):
+            longest_tail = max([lengths[dependent_id] for dependent_id
+                                in execution_graph.successors_iter(task_id)] or [0])
+            lengths[task_id] = weights.get(task_id, 0) + longest_tail
+        return lengths
+
+    def _get_task(self, task_id):
+        return self._execution_graph.node[task_id]['task']
@@ -0,0 +1,175 @@
+# Licensed to the Apache Software Foundation (ASF) under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Simulation of workflow executions on a virtual clock
+"""
+
+import copy
+import heapq
+import itertools
+import random
+from collections import defaultdict
+from datetime import datetime
+
+from ....modeling import models
+from . import scheduler
+from . import task as engine_task
+
+
+# The number of task names looked up in a single query of past task durations (SQLite limits the
+# number of variables in a query)
+_TASK_NAMES_QUERY_CHUNK_SIZE = 500
+
+
+class SimulationResult(object):
+    """
+    The outcome of a simulated execution
+    """
+
+    def __init__(self, makespan, critical_path, concurrency_peak, schedule):
+        """
+        :param makespan: the predicted duration of the execution in seconds
+        :param critical_path: list of the names of the operation tasks which the end of the
+                              execution waited for, in execution order
+        :param concurrency_peak: the largest number of operations executed at once
+        :param schedule: dict of task name to its (start, end) times in seconds, relative to the
+                         start of the execution
+        """
+        self.makespan = makespan
+        self.critical_path = critical_path
+        self.concurrency_peak = concurrency_peak
+        self.schedule = schedule
+
+    def __repr__(self):
+        return '{name}(makespan={self.makespan}, concurrency_peak={self.concurrency_peak})'.format(
+            name=self.__class__.__name__, self=self)
+
+
+def historical_durations(model_storage, task_names):
+    """
+    Reads the durations of past successful tasks
+    :param model_storage: the model storage
+    :param task_names: the names of the tasks to look up
+    :return: dict of task name to the list of its past durations in seconds
+    """
+    task_names = list(set(task_names))
+    durations = defaultdict(list)
+    for i in xrange(0, len(task_names), _TASK_NAMES_QUERY_CHUNK_SIZE):
+        for task_model in model_storage.task.iter(filters={
+                'name': task_names[i:i + _TASK_NAMES_QUERY_CHUNK_SIZE],
+                'status': models.Task.SUCCESS}):
+            if task_model.started_at and task_model.ended_at:
+                # timedelta.total_seconds is not available on Python 2.6
+                delta = task_model.ended_at - task_model.started_at
+                durations[task_model.name].append(
+                    delta.days * 86400 + delta.seconds + delta.microseconds / 1e6)
+    return durations
+
+
+def simulate(execution_graph, durations=None, history=None, limits=None, default_duration=1,
+             seed=None):
+    """
+    Simulates the execution of an execution graph on a virtual clock, handing out tasks in the same
+    order as the engine (see :class:`scheduler.Scheduler`). Operations are assumed to succeed, and
+    tasks which have already ended (e.g. of a resumed execution) take no time.
+
+    The duration of every operation task is drawn from its distribution, which is looked up in
+    ``durations`` by the task name, and then by its ``(interface name, operation name)``. A
+    distribution may be a number of seconds, a function returning a number of seconds, or a list of
+    samples to pick from. Tasks without a distribution are drawn from their ``history``, and
+    otherwise take ``default_duration``.
+    :param execution_graph: the execution graph
+    :param durations: dict of duration distributions supplied by the user
+    :param history: dict of task name to a list of its past durations (see
+                    :func:`historical_durations`)
+    :param limits: :class:`scheduler.ConcurrencyLimits` to simulate. Limits are copied, so they may
+                   be shared with an engine.
+    :param default_duration: the duration of tasks without a distribution
+    :param seed: seed of the random choices, for reproducible simulations
+    :return: :class:`SimulationResult`
+    """
+    durations = durations or {}
+    history = history or {}
+    rand = random.Random(seed)
+
+    def draw(task):
+        if not _is_executed(task):
+            return 0
+        distribution = durations.get(task.name,
+                                     durations.get((task.interface_name, task.operation_name)))
+        if distribution is None:
+            distribution = history.get(task.name) or default_duration
+        if callable(distribution):
+            return distribution()
+        if isinstance(distribution, (list, tuple)):
+            return rand.choice(distribution)
+        return distribution
+
+    task_durations = dict((task_id, draw(data['task']))
+                          for task_id, data in execution_graph.nodes_iter(data=True))
+    task_scheduler = scheduler.Scheduler(execution_graph,
+                                         limits=copy.deepcopy(limits),
+                                         weights=task_durations)
+    clock = 0
+    counter = itertools.count()
+    running = []
+    operations_running = 0
+    concurrency_peak = 0
+    schedule = {}
+    # The task each task waited for last, which is followed back to find the critical path
+    waited_for = {}
+    last_ended = None
+
+    while not task_scheduler.all_tasks_consumed():
+        # Retry due dates are irrelevant, as simulated operations do not fail
+        for task in task_scheduler.ready_tasks(now=datetime.max):
+            end = clock + task_durations[task.id]
+            schedule[task.id] = clock, end
+            heapq.heappush(running, (end, next(counter), task))
+            if _is_executed(task):
+                operations_running += 1
+                concurrency_peak = max(concurrency_peak, operations_running)
+            # Tasks are released by the task which ended last: either their last dependency, or
+            # (under concurrency limits) a task which freed its slot
+            waited_for[task.id] = last_ended
+        if not running:
+            raise RuntimeError('The simulation cannot make progress')
+        clock, _, task = heapq.heappop(running)
+        operations_running -= _is_executed(task)
+        last_ended = task.id
+        task_scheduler.task_ended(task)
+
+    critical_path = []
+    task_id = last_ended
+    while task_id is not None:
+        task = execution_graph.node[task_id]['task']
+        if _is_executed(task):
+            critical_path.append(task.name)
+        task_id = waited_for[task_id]
+    critical_path.reverse()
+
+    return SimulationResult(
+        makespan=clock,
+        critical_path=critical_path,
+        concurrency_peak=concurrency_peak,
+        schedule=dict((execution_graph.node[task_id]['task'].name, times)
+                      for task_id, times in schedule.items()
+                      if _is_executed(execution_graph.node[task_id]['task'])))
+
+
+def _is_executed(task):
+    return isinstance(task, engine_task.OperationTask) and bool(task.implementation) and \
+        not task.has_ended()
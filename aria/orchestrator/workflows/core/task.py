@@ -17,6 +17,7 @@
 Workflow tasks
 """
 
+import threading
 from contextlib import contextmanager
 from datetime import datetime
 from functools import (
@@ -55,6 +56,9 @@ class BaseTask(object):
     def execute(self):
         return self._executor.execute(self)
 
+    def terminate(self):
+        return self._executor.terminate(self)
+
     @property
     def id(self):
         """
@@ -113,55 +117,103 @@ class EndSubWorkflowTask(StubTask):
 
 class OperationTask(BaseTask):
     """
-    Operation task
+    Operation task.
+
+    The task state (status, timestamps and attempts count) is kept in memory, and is only written to
+    storage upon :meth:`flush`, along with the state of the node which resulted from the task (see
+    :attr:`node_state`) in a single transaction. This way the engine can follow the progress of its
+    tasks without querying the storage.
     """
-    def __init__(self, api_task, *args, **kwargs):
+    PENDING = models.Task.PENDING
+    RETRYING = models.Task.RETRYING
+    SENT = models.Task.SENT
+    STARTED = models.Task.STARTED
+    SUCCESS = models.Task.SUCCESS
+    FAILED = models.Task.FAILED
+    INFINITE_RETRIES = models.Task.INFINITE_RETRIES
+
+    _STATE_FIELDS = ('status', 'due_at', 'started_at', 'ended_at', 'attempts_count')
+    # Task model attributes which do not change throughout the execution
+    _STATIC_FIELDS = ('name', 'implementation', 'plugin_fk', 'node_fk', 'max_attempts',
+                      'retry_interval', 'ignore_failure')
+
+    def __init__(self, api_task, task_model=None, *args, **kwargs):
+        """
+        :param api_task: the API task to execute
+        :param task_model: the stored model of the task. If not provided, it is created and stored
+                           (see :meth:`create_task_model`)
+        """
         # If no executor is provided, we infer that this is an empty task which does not need to be
         # executed.
         super(OperationTask, self).__init__(id=api_task.id, *args, **kwargs)
         self._workflow_context = api_task._workflow_context
         self.interface_name = api_task.interface_name
         self.operation_name = api_task.operation_name
-        model_storage = api_task._workflow_context.model
+        self.retry_policy = api_task.retry_policy
+        # The interval before the latest retry, which some retry policies depend on
+        self.last_retry_interval = None
 
-        base_task_model = model_storage.task.model_cls
         if isinstance(api_task.actor, models.Node):
             context_cls = operation_context.NodeOperationContext
-            create_task_model = base_task_model.for_node
+            self.host_fk = api_task.actor.host_fk
         elif isinstance(api_task.actor, models.Relationship):
             context_cls = operation_context.RelationshipOperationContext
-            create_task_model = base_task_model.for_relationship
+            self.host_fk = api_task.actor.source_node.host_fk
         else:
             raise RuntimeError('No operation context could be created for {actor.model_cls}'
                                .format(actor=api_task.actor))
 
-        task_model = create_task_model(
+        if task_model is None:
+            task_model = self.create_task_model(api_task, self._workflow_context.execution)
+            self._workflow_context.model.task.put(task_model)
+
+        self._ctx = context_cls(name=api_task.name,
+                                model_storage=self._workflow_context.model,
+                                resource_storage=self._workflow_context.resource,
+                                service_id=self._workflow_context._service_id,
+                                task_id=task_model.id,
+                                actor_id=api_task.actor.id,
+                                execution_id=self._workflow_context._execution_id,
+                                workdir=self._workflow_context._workdir)
+        self._task_id = task_model.id
+        self._update_fields = None
+
+        for field in self._STATIC_FIELDS:
+            setattr(self, field, getattr(task_model, field))
+        self._state = dict((field, getattr(task_model, field)) for field in self._STATE_FIELDS)
+        self._unflushed_state = {}
+        self._write_behind = True
+        # Executors update the state from their own threads, while the engine flushes it
+        self._state_lock = threading.Lock()
+
+    @staticmethod
+    def create_task_model(api_task, execution):
+        """
+        Creates the task model of an API task, without storing it
+        :param api_task: the API task
+        :param execution: the execution the task belongs to
+        :return: task model
+        """
+        base_task_model = api_task._workflow_context.model.task.model_cls
+        if isinstance(api_task.actor, models.Node):
+            create_task_model = base_task_model.for_node
+        else:
+            create_task_model = base_task_model.for_relationship
+
+        return create_task_model(
             name=api_task.name,
             actor=api_task.actor,
             status=base_task_model.PENDING,
             max_attempts=api_task.max_attempts,
             retry_interval=api_task.retry_interval,
             ignore_failure=api_task.ignore_failure,
-            execution=self._workflow_context.execution,
+            execution=execution,
 
             # Only non-stub tasks have these fields
             plugin=api_task.plugin,
             implementation=api_task.implementation,
             inputs=api_task.inputs
-
         )
-        self._workflow_context.model.task.put(task_model)
-
-        self._ctx = context_cls(name=api_task.name,
-                                model_storage=self._workflow_context.model,
-                                resource_storage=self._workflow_context.resource,
-                                service_id=self._workflow_context._service_id,
-                                task_id=task_model.id,
-                                actor_id=api_task.actor.id,
-                                execution_id=self._workflow_context._execution_id,
-                                workdir=self._workflow_context._workdir)
-        self._task_id = task_model.id
-        self._update_fields = None
 
     @contextmanager
     def _update(self):
@@ -172,12 +224,44 @@ class OperationTask(BaseTask):
         self._update_fields = {}
         try:
             yield
-            for key, value in self._update_fields.items():
-                setattr(self.model_task, key, value)
-            self.model_task = self.model_task
+            with self._state_lock:
+                self._state.update(self._update_fields)
+                self._unflushed_state.update(self._update_fields)
+                write_behind = self._write_behind
+            # Operations may read the state of their node (e.g. the transitional state while they
+            # run), so node state changes are written right away, in the same transaction as the
+            # task state
+            if not write_behind or 'node_state' in self._update_fields:
+                self.flush(write_behind=write_behind)
         finally:
             self._update_fields = None
 
+    def flush(self, write_behind=True):
+        """
+        Writes the state changes made since the last flush to storage
+        :param write_behind: whether further state changes should wait for the next flush, or be
+                             written to storage right away (e.g. once the engine no longer follows
+                             the task)
+        """
+        with self._state_lock:
+            unflushed_state, self._unflushed_state = self._unflushed_state, {}
+            self._write_behind = write_behind
+        if unflushed_state:
+            node_state = unflushed_state.pop('node_state', None)
+            model_task = self.model_task
+            for key, value in unflushed_state.items():
+                setattr(model_task, key, value)
+            if node_state is not None:
+                # The node shares the session of the task, so both are committed together
+                model_task.node.state = node_state
+            self.model_task = model_task
+
+    def has_ended(self):
+        return self.status in models.Task.END_STATES
+
+    def is_waiting(self):
+        return self.status in models.Task.WAIT_STATES
+
     @property
     def model_task(self):
         """
@@ -204,7 +288,7 @@ class OperationTask(BaseTask):
         Returns the task status
         :return: task status
         """
-        return self.model_task.status
+        return self._state['status']
 
     @status.setter
     @_locked
@@ -217,7 +301,7 @@ class OperationTask(BaseTask):
         Returns when the task started
         :return: when task started
         """
-        return self.model_task.started_at
+        return self._state['started_at']
 
     @started_at.setter
     @_locked
@@ -230,7 +314,7 @@ class OperationTask(BaseTask):
         Returns when the task ended
         :return: when task ended
         """
-        return self.model_task.ended_at
+        return self._state['ended_at']
 
     @ended_at.setter
     @_locked
@@ -243,7 +327,7 @@ class OperationTask(BaseTask):
         Returns the attempts count for the task
         :return: attempts count
         """
-        return self.model_task.attempts_count
+        return self._state['attempts_count']
 
     @attempts_count.setter
     @_locked
@@ -256,13 +340,26 @@ class OperationTask(BaseTask):
         Returns the minimum datetime in which the task can be executed
         :return: eta
         """
-        return self.model_task.due_at
+        return self._state['due_at']
 
     @due_at.setter
     @_locked
     def due_at(self, value):
         self._update_fields['due_at'] = value
 
+    @property
+    def node_state(self):
+        """
+        Returns the state of the task's node which resulted from the task, if any
+        :return: node state
+        """
+        return self._state.get('node_state')
+
+    @node_state.setter
+    @_locked
+    def node_state(self, value):
+        self._update_fields['node_state'] = value
+
     def __getattr__(self, attr):
         try:
             return getattr(self.model_task, attr)
@@ -17,6 +17,12 @@
 Translation of user graph's API to the execution graph
 """
 
+from collections import (
+    defaultdict,
+    deque
+)
+from datetime import datetime
+
 from .. import api
 from ..executor import base
 from . import task as core_task
@@ -28,7 +34,9 @@ def build_execution_graph(
         default_executor,
         start_cls=core_task.StartWorkflowTask,
         end_cls=core_task.EndWorkflowTask,
-        depends_on=()):
+        depends_on=(),
+        task_models=None,
+        resume=False):
     """
     Translates the user graph to the execution graph
     :param task_graph: The user's graph
@@ -37,7 +45,13 @@ def build_execution_graph(
     :param start_cls: internal use
     :param end_cls: internal use
     :param depends_on: internal use
+    :param task_models: internal use
+    :param resume: whether to use the task models already stored for the execution (see
+                   :func:`_load_task_models`) rather than create new ones
     """
+    if task_models is None:
+        task_models = _load_task_models(task_graph) if resume else _store_task_models(task_graph)
+
     # Insert start marker
     start_task = start_cls(id=_start_graph_suffix(task_graph.id), executor=base.StubTaskExecutor())
     _add_task_and_dependencies(execution_graph, start_task, depends_on)
@@ -48,7 +62,9 @@ def build_execution_graph(
             execution_graph, dependencies, default=[start_task])
 
         if isinstance(api_task, api.task.OperationTask):
-            operation_task = core_task.OperationTask(api_task, executor=default_executor)
+            operation_task = core_task.OperationTask(api_task,
+                                                     task_model=task_models[api_task.id],
+                                                     executor=default_executor)
             _add_task_and_dependencies(execution_graph, operation_task, operation_dependencies)
         elif isinstance(api_task, api.task.WorkflowTask):
             # Build the graph recursively while adding start and end markers
@@ -58,7 +74,8 @@ def build_execution_graph(
                 default_executor=default_executor,
                 start_cls=core_task.StartSubWorkflowTask,
                 end_cls=core_task.EndSubWorkflowTask,
-                depends_on=operation_dependencies
+                depends_on=operation_dependencies,
+                task_models=task_models
             )
         elif isinstance(api_task, api.task.StubTask):
             stub_task = core_task.StubTask(id=api_task.id, executor=base.StubTaskExecutor())
@@ -75,6 +92,73 @@ def build_execution_graph(
     _add_task_and_dependencies(execution_graph, end_task, workflow_dependencies)
 
 
+def _store_task_models(task_graph):
+    """
+    Creates the models of all the operation tasks in the graph (including sub-workflows), and
+    stores them in a single transaction.
+    :return: dict of API task id to its task model
+    """
+    api_tasks = list(_get_operation_tasks(task_graph))
+    if not api_tasks:
+        return {}
+    workflow_context = api_tasks[0].workflow_context
+    execution = workflow_context.execution
+    task_models = [core_task.OperationTask.create_task_model(api_task, execution)
+                   for api_task in api_tasks]
+    workflow_context.model.task.put_all(task_models)
+    return dict((api_task.id, task_model) for api_task, task_model in zip(api_tasks, task_models))
+
+
+def _load_task_models(task_graph):
+    """
+    Matches the operation tasks in the graph with the task models stored by an interrupted run of
+    the execution, by their names. Tasks which were handed to an executor, but did not end, are
+    reset so they are executed again. Tasks which failed (and whose failure is not ignored) are
+    reset as well, with all of their attempts, as they would otherwise fail the execution again at
+    once. Tasks which have no stored model are created.
+    :return: dict of API task id to its task model
+    """
+    api_tasks = list(_get_operation_tasks(task_graph))
+    if not api_tasks:
+        return {}
+    workflow_context = api_tasks[0].workflow_context
+    execution = workflow_context.execution
+    task_model_cls = workflow_context.model.task.model_cls
+
+    stored_task_models = defaultdict(deque)
+    for task_model in sorted(execution.tasks, key=lambda task_model: task_model.id):
+        stored_task_models[task_model.name].append(task_model)
+
+    task_models = {}
+    changed_task_models = []
+    for api_task in api_tasks:
+        if stored_task_models[api_task.name]:
+            task_model = stored_task_models[api_task.name].popleft()
+            if task_model.status == task_model_cls.FAILED and not task_model.ignore_failure:
+                task_model.attempts_count = 1
+                task_model.started_at = task_model.ended_at = None
+            elif task_model.status not in (task_model_cls.SENT, task_model_cls.STARTED):
+                task_models[api_task.id] = task_model
+                continue
+            task_model.status = task_model_cls.PENDING
+            task_model.due_at = datetime.utcnow()
+        else:
+            task_model = core_task.OperationTask.create_task_model(api_task, execution)
+        task_models[api_task.id] = task_model
+        changed_task_models.append(task_model)
+    workflow_context.model.task.put_all(changed_task_models)
+    return task_models
+
+
+def _get_operation_tasks(task_graph):
+    for api_task in task_graph.topological_order(reverse=True):
+        if isinstance(api_task, api.task.OperationTask):
+            yield api_task
+        elif isinstance(api_task, api.task.WorkflowTask):
+            for sub_workflow_api_task in _get_operation_tasks(api_task):
+                yield sub_workflow_api_task
+
+
 def _add_task_and_dependencies(execution_graph, operation_task, operation_dependencies=()):
     execution_graph.add_node(operation_task.id, task=operation_task)
     for dependency in operation_dependencies:
@@ -105,5 +189,5 @@ def _end_graph_suffix(id):
 
 def _get_non_dependency_tasks(graph):
     for task in graph.tasks:
-        if len(list(graph.get_dependents(task))) == 0:
+        if next(graph.get_dependents(task), None) is None:
             yield task
@@ -18,5 +18,5 @@ Executors for task execution
 """
 
 
-from . import process, thread
+from . import coroutine, process, thread
 from .base import BaseExecutor
@@ -17,8 +17,13 @@
 Base executor module
 """
 
+import os
+import sys
+import threading
+
 from aria import logger
 from aria.orchestrator import events
+from aria.utils import imports
 
 
 class BaseExecutor(logger.LoggerMixin):
@@ -42,6 +47,13 @@ class BaseExecutor(logger.LoggerMixin):
             self._task_started(task)
             self._task_succeeded(task)
 
+    def terminate(self, task):
+        """
+        Terminate a running task. By default, running tasks are left to end on their own
+        :param task: task to terminate
+        """
+        pass
+
     def close(self):
         """
         Close the executor
@@ -51,14 +63,145 @@ class BaseExecutor(logger.LoggerMixin):
     @staticmethod
     def _task_started(task):
         events.start_task_signal.send(task)
+        events.task_state_changed_signal.send(task)
 
     @staticmethod
     def _task_failed(task, exception, traceback=None):
         events.on_failure_task_signal.send(task, exception=exception, traceback=traceback)
+        events.task_state_changed_signal.send(task)
 
     @staticmethod
     def _task_succeeded(task):
         events.on_success_task_signal.send(task)
+        events.task_state_changed_signal.send(task)
+
+
+class PluginLoaderMixin(object):
+    """
+    Loads the implementations of operations into the executor's own process.
+
+    Plugin operations can be loaded if a ``plugin_manager`` is provided. The directories of a plugin
+    are added to ``sys.path`` and to the PATH and PYTHONPATH of ``os.environ`` only while its
+    operations are running (see :class:`_PluginEnvironment`), so that they do not leak into other
+    operations, nor into the subprocesses of a ProcessExecutor. Note that unlike the
+    ProcessExecutor, the modules of all plugins are shared by the same process, so plugins depending
+    on conflicting versions of the same package should be executed using the ProcessExecutor.
+    """
+
+    def __init__(self, plugin_manager=None, *args, **kwargs):
+        super(PluginLoaderMixin, self).__init__(*args, **kwargs)
+        self._plugin_manager = plugin_manager
+        # plugin id to the directories the plugin adds to the environment
+        self._plugin_paths = {}
+        self._plugins_lock = threading.Lock()
+
+    def _load_implementation(self, task):
+        """
+        Loads the implementation of a task, and applies the environment of its plugin until
+        :meth:`_release_implementation` is called
+        """
+        if not (task.plugin_fk and self._plugin_manager):
+            return imports.load_attribute(task.implementation)
+        paths = self._get_plugin_paths(task.plugin)
+        plugin_environment.enter(task.plugin_fk, paths)
+        try:
+            return imports.load_attribute(task.implementation)
+        except BaseException:
+            plugin_environment.exit(task.plugin_fk)
+            raise
+
+    def _release_implementation(self, task):
+        if task.plugin_fk and self._plugin_manager:
+            plugin_environment.exit(task.plugin_fk)
+
+    def _get_plugin_paths(self, plugin):
+        with self._plugins_lock:
+            if plugin.id not in self._plugin_paths:
+                # The plugin is loaded into a private environment, which holds nothing but the
+                # directories it adds
+                env = dict((name, '') for name in _PluginEnvironment.VARIABLES)
+                self._plugin_manager.load_plugin(plugin, env=env)
+                paths = dict((name, [path for path in env[name].split(os.pathsep) if path])
+                             for name in _PluginEnvironment.VARIABLES)
+                paths['sys.path'] = self._plugin_manager.get_plugin_pythonpath_dirs(plugin)
+                self._plugin_paths[plugin.id] = paths
+            return self._plugin_paths[plugin.id]
+
+
+class _PluginEnvironment(object):
+    """
+    The environment of the plugins whose operations are running in this process.
+
+    ``os.environ`` and ``sys.path`` are shared by all the threads of the process, so while any
+    plugin operation is running they hold the directories of all the plugins with running
+    operations, and they are restored once none is.
+    """
+
+    VARIABLES = ('PATH', 'PYTHONPATH')
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # plugin id to [number of running operations, directories of the plugin]
+        self._running = {}
+        # The values of the variables before any plugin was applied (None if unset)
+        self._original = {}
+        self._added_sys_path = []
+
+    def enter(self, plugin_id, paths):
+        with self._lock:
+            if not self._running:
+                self._original = dict((name, os.environ.get(name)) for name in self.VARIABLES)
+            self._running.setdefault(plugin_id, [0, paths])[0] += 1
+            self._apply()
+
+    def exit(self, plugin_id):
+        with self._lock:
+            entry = self._running[plugin_id]
+            entry[0] -= 1
+            if not entry[0]:
+                del self._running[plugin_id]
+            self._apply()
+
+    def original_environ(self):
+        """
+        A copy of ``os.environ`` without the directories of the running plugins
+        """
+        with self._lock:
+            env = os.environ.copy()
+            if self._running:
+                for name, value in self._original.items():
+                    if value is None:
+                        env.pop(name, None)
+                    else:
+                        env[name] = value
+            return env
+
+    def _apply(self):
+        all_paths = [paths for _, paths in self._running.values()]
+        if self._original:
+            for name in self.VARIABLES:
+                values = [path for paths in all_paths for path in paths[name]]
+                if self._original[name] is not None:
+                    values.append(self._original[name])
+                if values:
+                    os.environ[name] = os.pathsep.join(values)
+                else:
+                    os.environ.pop(name, None)
+        # Only directories which were not already in sys.path are removed from it
+        wanted_sys_path = [path for paths in all_paths for path in paths['sys.path']]
+        for path in self._added_sys_path:
+            if path not in wanted_sys_path and path in sys.path:
+                sys.path.remove(path)
+        self._added_sys_path = [path for path in self._added_sys_path if path in wanted_sys_path]
+        for path in wanted_sys_path:
+            if path not in sys.path:
+                sys.path.append(path)
+                self._added_sys_path.append(path)
+        if not self._running:
+            self._original = {}
+
+
+plugin_environment = _PluginEnvironment()
 
 
 class StubTaskExecutor(BaseExecutor):                                                               # pylint: disable=abstract-method
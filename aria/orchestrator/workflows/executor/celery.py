@@ -14,84 +14,229 @@
 # limitations under the License.
 
 """
-Celery based executor
+Celery based executor.
+
+Operations are executed by Celery workers, which must register the operation task on their Celery
+app using :func:`register_operation_task`, with access to the same storage as the orchestrator::
+
+    app = celery.Celery(broker=..., backend=...)
+    register_operation_task(app, model_storage=aria.application_model_storage(...))
+
+Workers only consume the queues they are started with (e.g. ``celery worker -Q aria.plugin.x``),
+so tasks can be routed to the workers which have their plugin installed, or which can reach their
+host (see ``routing`` of :class:`CeleryExecutor`).
 """
 
 import threading
-import Queue
+from functools import partial
+
+from aria.orchestrator import exceptions as orchestrator_exceptions
+from aria.utils import imports
+
+from .base import BaseExecutor
+
+
+OPERATION_TASK_NAME = 'aria.execute_operation'
+
+ROUTE_BY_PLUGIN = 'plugin'
+ROUTE_BY_HOST = 'host'
 
-from aria.orchestrator.workflows.executor import BaseExecutor
+DEFAULT_QUEUE_PREFIX = 'aria'
+DEFAULT_POLL_INTERVAL = 0.5
+
+# Celery task states (see ``celery.states``)
+_PENDING = 'PENDING'
+_STARTED = 'STARTED'
+_SUCCESS = 'SUCCESS'
+_FAILURE = 'FAILURE'
+_REVOKED = 'REVOKED'
+
+# Operation context entries which refer to storage, which workers provide on their own
+_STORAGE_CONTEXT_KEYS = ('model_storage', 'resource_storage')
 
 
 class CeleryExecutor(BaseExecutor):
     """
-    Executor which runs tasks using aria_celery
+    Executor which runs tasks on Celery workers.
+
+    The states of the tasks in flight are polled from the Celery result backend together, once
+    every ``poll_interval``, and the signals of all the state changes found are sent as a batch.
+    Key-value result backends (e.g. Redis, Memcached) are polled with a single request for all the
+    states, while other backends are asked for the state of each task.
+    Unlike capturing Celery events, this does not require workers to send events, and works with
+    any broker and result backend (including the in-memory ones, which are useful for testing).
     """
 
-    def __init__(self, app, *args, **kwargs):
+    def __init__(self, app, routing=None, queue_prefix=DEFAULT_QUEUE_PREFIX,
+                 poll_interval=DEFAULT_POLL_INTERVAL, *args, **kwargs):
+        """
+        :param app: the Celery app
+        :param routing: how tasks are routed to queues: ``ROUTE_BY_PLUGIN`` routes plugin operations
+                        to a queue per plugin (``<prefix>.plugin.<plugin name>``),
+                        ``ROUTE_BY_HOST`` routes operations to a queue per host node
+                        (``<prefix>.host.<host node id>``), and a function receiving a task may
+                        return the name of its queue. Tasks which are not routed (e.g. when
+                        ``routing`` is None) are sent to the default queue of the app.
+        :param queue_prefix: the prefix of the queue names
+        :param poll_interval: the interval (in seconds) between polls of the task states
+        """
         super(CeleryExecutor, self).__init__(*args, **kwargs)
         self._app = app
-        self._started_signaled = False
-        self._started_queue = Queue.Queue(maxsize=1)
+        self._routing = routing
+        self._queue_prefix = queue_prefix
+        self._poll_interval = poll_interval
+        # task id to (task, async result, whether the task was reported as started)
         self._tasks = {}
-        self._results = {}
-        self._receiver = None
-        self._stopped = False
-        self._receiver_thread = threading.Thread(target=self._events_receiver)
-        self._receiver_thread.daemon = True
-        self._receiver_thread.start()
-        self._started_queue.get(timeout=30)
+        self._tasks_lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._poller_thread = threading.Thread(target=self._poller, name='CeleryExecutor')
+        self._poller_thread.daemon = True
+        self._poller_thread.start()
 
     def _execute(self, task):
-        self._tasks[task.id] = task
-        inputs = dict(inp.unwrap() for inp in task.inputs.values())
-        inputs['ctx'] = task.context
-        self._results[task.id] = self._app.send_task(
-            task.operation_mapping,
-            kwargs=inputs,
+        result = self._app.send_task(
+            OPERATION_TASK_NAME,
+            kwargs={
+                'implementation': task.implementation,
+                'operation_inputs': dict(inp.unwrap() for inp in task.inputs.values()),
+                'context': _serialize_context(task.context)
+            },
             task_id=task.id,
             queue=self._get_queue(task))
+        with self._tasks_lock:
+            self._tasks[task.id] = (task, result, False)
+
+    def terminate(self, task):
+        with self._tasks_lock:
+            entry = self._tasks.pop(task.id, None)
+        if entry is None:
+            return
+        _, result, _ = entry
+        try:
+            result.revoke(terminate=True)
+        except BaseException as e:
+            self.logger.debug('Could not revoke task {0}: {1}'.format(task.id, e))
+        self._task_failed(task, exception=orchestrator_exceptions.TaskAbortException(
+            'Task terminated'))
 
     def close(self):
-        self._stopped = True
-        if self._receiver:
-            self._receiver.should_stop = True
-        self._receiver_thread.join()
-
-    @staticmethod
-    def _get_queue(task):
-        return None if task else None  # TODO
-
-    def _events_receiver(self):
-        with self._app.connection() as connection:
-            self._receiver = self._app.events.Receiver(connection, handlers={
-                'task-started': self._celery_task_started,
-                'task-succeeded': self._celery_task_succeeded,
-                'task-failed': self._celery_task_failed,
-            })
-            for _ in self._receiver.itercapture(limit=None, timeout=None, wakeup=True):
-                if not self._started_signaled:
-                    self._started_queue.put(True)
-                    self._started_signaled = True
-                if self._stopped:
-                    return
-
-    def _celery_task_started(self, event):
-        self._task_started(self._tasks[event['uuid']])
-
-    def _celery_task_succeeded(self, event):
-        task, _ = self._remove_task(event['uuid'])
-        self._task_succeeded(task)
-
-    def _celery_task_failed(self, event):
-        task, async_result = self._remove_task(event['uuid'])
+        if self._stopped.is_set():
+            return
+        self._stopped.set()
+        self._poller_thread.join()
+
+    def _get_queue(self, task):
+        if callable(self._routing):
+            return self._routing(task)
+        if self._routing == ROUTE_BY_PLUGIN and task.plugin_fk:
+            return '{0}.plugin.{1}'.format(self._queue_prefix, task.plugin.name)
+        if self._routing == ROUTE_BY_HOST and getattr(task, 'host_fk', None):
+            return '{0}.host.{1}'.format(self._queue_prefix, task.host_fk)
+        return None
+
+    def _poller(self):
+        while not self._stopped.wait(self._poll_interval):
+            try:
+                self._poll()
+            except BaseException as e:
+                # The poller thread must keep following the tasks in flight
+                self.logger.debug('Could not poll the Celery task states: {0}'.format(e))
+
+    def _poll(self):
+        with self._tasks_lock:
+            entries = self._tasks.values()
+        states = self._fetch_states([result for _, result, _ in entries])
+        reports = []
+        for task, result, started in entries:
+            state = states[result.id]
+            task_reports = []
+            if not started and state in (_STARTED, _SUCCESS, _FAILURE):
+                task_reports.append(partial(self._task_started, task))
+            if state == _SUCCESS:
+                task_reports.append(partial(self._task_succeeded, task))
+            elif state in (_FAILURE, _REVOKED):
+                task_reports.append(partial(self._celery_task_failed, task, result))
+            if not task_reports:
+                continue
+            with self._tasks_lock:
+                # The task may have been terminated meanwhile, in which case it was already reported
+                if task.id not in self._tasks:
+                    continue
+                if state in (_SUCCESS, _FAILURE, _REVOKED):
+                    del self._tasks[task.id]
+                else:
+                    self._tasks[task.id] = (task, result, True)
+            reports.extend(task_reports)
+
+        for report in reports:
+            report()
+
+    def _fetch_states(self, results):
+        """
+        :return: dict of the states of the Celery tasks by their ids
+        """
+        backend = self._app.backend
+        if not results or not hasattr(backend, 'mget'):
+            return dict((result.id, result.state) for result in results)
+        keys = [backend.get_key_for_task(result.id) for result in results]
+        values = backend.mget(keys)
+        # Some clients return the found values by their keys, and others a list of all the values
+        if not hasattr(values, 'items'):
+            values = dict(zip(keys, values))
+        states = {}
+        for result, key in zip(results, keys):
+            value = values.get(key)
+            states[result.id] = backend.decode_result(value)['status'] if value else _PENDING
+        return states
+
+    def _celery_task_failed(self, task, result):
         try:
-            exception = async_result.result
+            exception = result.result
         except BaseException as e:
             exception = RuntimeError(
                 'Could not de-serialize exception of task {0} --> {1}: {2}'
                 .format(task.name, type(e).__name__, str(e)))
-        self._task_failed(task, exception=exception)
+        if not isinstance(exception, BaseException):
+            # e.g. the task was revoked
+            exception = orchestrator_exceptions.TaskAbortException(
+                'Task {0} was revoked'.format(task.name))
+        self._task_failed(task, exception=exception, traceback=result.traceback)
+
+
+def register_operation_task(app, model_storage, resource_storage=None):
+    """
+    Registers the task which executes operations on a Celery app. Workers must register it, while
+    the orchestrator only needs the app to send tasks.
+    :param app: the Celery app
+    :param model_storage: the model storage of the orchestrator
+    :param resource_storage: the resource storage of the orchestrator
+    :return: the Celery task
+    """
+    @app.task(name=OPERATION_TASK_NAME, track_started=True)
+    def execute_operation(implementation, operation_inputs, context):
+        ctx = _deserialize_context(context, model_storage, resource_storage)
+        task_func = imports.load_attribute(implementation)
+        task_func(ctx=ctx, **operation_inputs)
+
+    return execute_operation
+
+
+def _serialize_context(ctx):
+    """
+    Describes an operation context by its class and the ids it refers to, without its storage
+    """
+    serialization_dict = ctx.serialization_dict
+    context_cls = serialization_dict['context_cls']
+    context = dict((key, value) for key, value in serialization_dict['context'].items()
+                   if key not in _STORAGE_CONTEXT_KEYS)
+    return {
+        'context_cls': '{0}.{1}'.format(context_cls.__module__, context_cls.__name__),
+        'context': context
+    }
+
 
-    def _remove_task(self, task_id):
-        return self._tasks.pop(task_id), self._results.pop(task_id)
+def _deserialize_context(context_dict, model_storage, resource_storage):
+    context_cls = imports.import_fullname(context_dict['context_cls'])
+    return context_cls(model_storage=model_storage,
+                       resource_storage=resource_storage,
+                       **context_dict['context'])
@@ -0,0 +1,385 @@
+# Licensed to the Apache Software Foundation (ASF) under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Coroutine based executor.
+
+Operations executed by the :class:`CoroutineExecutor` may be generator functions, which yield
+whenever they wait for I/O or for time to pass, e.g.::
+
+    from aria.orchestrator.workflows.executor import coroutine
+
+    @operation
+    def create(ctx, **_):
+        sock = _connect(ctx.node.attributes['address'])
+        yield coroutine.Writable(sock)
+        sock.send(REQUEST)
+        yield coroutine.Readable(sock)
+        ctx.node.attributes['response'] = sock.recv(4096)
+
+A coroutine may also yield another generator, which runs until it ends (or raises
+:class:`Return`), and whose result is sent back to the yielding coroutine.
+"""
+
+import errno
+import heapq
+import itertools
+import math
+import select
+import socket
+import sys
+import threading
+import time
+import types
+import Queue
+
+from aria.orchestrator import exceptions as orchestrator_exceptions
+from aria.utils import exceptions
+
+from .base import BaseExecutor, PluginLoaderMixin
+
+if hasattr(select, 'poll'):
+    _POLL_ERRORS = select.POLLHUP | select.POLLERR | select.POLLNVAL
+    _POLL_READABLE = select.POLLIN | select.POLLPRI | _POLL_ERRORS
+    _POLL_WRITABLE = select.POLLOUT | _POLL_ERRORS
+
+
+class Sleep(object):
+    """
+    Yielded by a coroutine in order to wait for a number of seconds
+    """
+
+    def __init__(self, seconds):
+        self.seconds = seconds
+
+
+class Readable(object):
+    """
+    Yielded by a coroutine in order to wait until a file object (or descriptor) can be read from
+    """
+
+    def __init__(self, fileobj):
+        self.fileobj = fileobj
+
+
+class Writable(object):
+    """
+    Yielded by a coroutine in order to wait until a file object (or descriptor) can be written to
+    """
+
+    def __init__(self, fileobj):
+        self.fileobj = fileobj
+
+
+class Return(Exception):
+    """
+    Raised by a coroutine in order to end with a result (Python 2 generators cannot return values)
+    """
+
+    def __init__(self, value=None):
+        super(Return, self).__init__()
+        self.value = value
+
+
+class CoroutineExecutor(PluginLoaderMixin, BaseExecutor):
+    """
+    Executor which runs the tasks of all operations on a single event loop thread. Operations which
+    are generator functions are run as coroutines (see the module documentation), so a single
+    thread can drive a large number of I/O bound operations at once. Operations which are plain
+    functions are called on the event loop thread, and therefore block all other operations until
+    they return.
+
+    The event loop waits for I/O using ``poll`` where it is available, and otherwise using
+    ``select``, which on Windows only supports sockets. Several coroutines may wait for the same
+    file object, in which case they are woken up one at a time, in the order in which they started
+    waiting.
+
+    Plugin operations can be executed if a ``plugin_manager`` is provided (see
+    :class:`PluginLoaderMixin`).
+    """
+
+    def __init__(self, plugin_manager=None, *args, **kwargs):
+        super(CoroutineExecutor, self).__init__(plugin_manager=plugin_manager, *args, **kwargs)
+        self._stopped = False
+        # Other threads hand requests to the event loop through this queue, and wake it up by
+        # writing to the waker socket
+        self._requests = Queue.Queue()
+        self._waker_reader, self._waker_writer = _socket_pair()
+        self._coroutines = {}
+        # The coroutines waiting for each file descriptor
+        self._readers = {}
+        self._writers = {}
+        # select is limited to descriptors below FD_SETSIZE, so poll is used where available
+        self._poller = select.poll() if hasattr(select, 'poll') else None
+        if self._poller is not None:
+            self._poller.register(self._waker_reader.fileno(), select.POLLIN)
+        self._timers = []
+        self._counter = itertools.count()
+        self._loop_thread = threading.Thread(target=self._loop, name='CoroutineExecutor')
+        self._loop_thread.daemon = True
+        self._loop_thread.start()
+
+    def _execute(self, task):
+        self._request(self._start, task)
+
+    def terminate(self, task):
+        self._request(self._terminate, task)
+
+    def close(self):
+        if self._stopped:
+            return
+        self._stopped = True
+        self._wake()
+        self._loop_thread.join()
+        self._waker_reader.close()
+        self._waker_writer.close()
+
+    def _request(self, func, task):
+        self._requests.put((func, task))
+        self._wake()
+
+    def _wake(self):
+        try:
+            self._waker_writer.send(b'x')
+        except socket.error:
+            # The loop is woken up anyway, once it reads the bytes already written
+            pass
+
+    def _loop(self):
+        while not self._stopped:
+            readable, writable = self._select()
+            if self._waker_reader.fileno() in readable:
+                self._waker_reader.recv(4096)
+            self._handle_requests()
+            for waiters, filenos in ((self._readers, readable), (self._writers, writable)):
+                for fileno in filenos:
+                    coroutine = self._unwait(waiters, fileno)
+                    if coroutine is not None:
+                        self._step(coroutine)
+            now = time.time()
+            while self._timers and self._timers[0][0] <= now:
+                coroutine = heapq.heappop(self._timers)[-1]
+                # Terminated coroutines are not removed from the timers heap
+                if not coroutine.ended:
+                    self._step(coroutine)
+        for coroutine in self._coroutines.values():
+            coroutine.close()
+            self._release_implementation(coroutine.task)
+
+    def _select(self):
+        """
+        Waits until a file descriptor is ready, or until the next timer is due
+        :return: the readable and the writable file descriptors
+        """
+        timeout = None
+        if self._timers:
+            timeout = max(self._timers[0][0] - time.time(), 0)
+        try:
+            if self._poller is not None:
+                events = self._poller.poll(None if timeout is None
+                                           else int(math.ceil(timeout * 1000)))
+                # Errors and hang-ups wake the waiters, which then fail on their next operation
+                return ([fileno for fileno, event in events if event & _POLL_READABLE],
+                        [fileno for fileno, event in events if event & _POLL_WRITABLE])
+            readable, writable, _ = select.select([self._waker_reader.fileno()] +
+                                                  self._readers.keys(),
+                                                  self._writers.keys(), [], timeout)
+        except (select.error, socket.error) as e:
+            if e.args[0] == errno.EINTR:
+                return [], []
+            raise
+        return readable, writable
+
+    def _wait(self, waiters, fileno, coroutine):
+        waiters.setdefault(fileno, []).append(coroutine)
+        coroutine.waiting_for = fileno
+        self._update_poller(fileno)
+
+    def _unwait(self, waiters, fileno, coroutine=None):
+        """
+        Removes a coroutine waiting for a file descriptor
+        :param coroutine: the coroutine to remove, or None for the one which waited the longest
+        :return: the removed coroutine, or None if it was not waiting
+        """
+        fileno_waiters = waiters.get(fileno)
+        if not fileno_waiters:
+            return None
+        if coroutine is None:
+            coroutine = fileno_waiters.pop(0)
+        elif coroutine in fileno_waiters:
+            fileno_waiters.remove(coroutine)
+        else:
+            return None
+        if not fileno_waiters:
+            del waiters[fileno]
+        self._update_poller(fileno)
+        return coroutine
+
+    def _update_poller(self, fileno):
+        if self._poller is None:
+            return
+        events = (select.POLLIN if fileno in self._readers else 0) | \
+            (select.POLLOUT if fileno in self._writers else 0)
+        if events:
+            self._poller.register(fileno, events)
+        else:
+            try:
+                self._poller.unregister(fileno)
+            except KeyError:
+                pass
+
+    def _handle_requests(self):
+        while True:
+            try:
+                func, task = self._requests.get_nowait()
+            except Queue.Empty:
+                return
+            func(task)
+
+    def _start(self, task):
+        self._task_started(task)
+        try:
+            task_func = self._load_implementation(task)
+        except BaseException:
+            self._task_failed(task,
+                              exception=sys.exc_info()[1],
+                              traceback=exceptions.get_exception_as_string(*sys.exc_info()))
+            return
+        try:
+            inputs = dict(inp.unwrap() for inp in task.inputs.values())
+            result = task_func(ctx=task.context, **inputs)
+        except BaseException:
+            self._release_implementation(task)
+            self._task_failed(task,
+                              exception=sys.exc_info()[1],
+                              traceback=exceptions.get_exception_as_string(*sys.exc_info()))
+            return
+        if isinstance(result, types.GeneratorType):
+            # The implementation is released once the coroutine ends
+            coroutine = _Coroutine(task, result)
+            self._coroutines[task.id] = coroutine
+            self._step(coroutine)
+        else:
+            self._release_implementation(task)
+            self._task_succeeded(task)
+
+    def _terminate(self, task):
+        coroutine = self._coroutines.pop(task.id, None)
+        if coroutine is None:
+            return
+        self._unwait(self._readers, coroutine.waiting_for, coroutine)
+        self._unwait(self._writers, coroutine.waiting_for, coroutine)
+        coroutine.close()
+        self._release_implementation(task)
+        self._task_failed(task, exception=orchestrator_exceptions.TaskAbortException(
+            'Task terminated'))
+
+    def _step(self, coroutine, value=None):
+        """
+        Runs a coroutine until it waits for something, or until it ends
+        """
+        coroutine.waiting_for = None
+        exc_info = None
+        while True:
+            generator = coroutine.stack[-1]
+            try:
+                if exc_info is not None:
+                    request = generator.throw(*exc_info)
+                else:
+                    request = generator.send(value)
+            except (StopIteration, Return) as e:
+                value, exc_info = getattr(e, 'value', None), None
+                if self._pop(coroutine):
+                    self._task_succeeded(coroutine.task)
+                    return
+                continue
+            except BaseException:
+                value, exc_info = None, sys.exc_info()
+                if self._pop(coroutine):
+                    self._task_failed(
+                        coroutine.task,
+                        exception=exc_info[1],
+                        traceback=exceptions.get_exception_as_string(*exc_info))
+                    return
+                continue
+
+            value = None
+            if isinstance(request, types.GeneratorType):
+                coroutine.stack.append(request)
+            elif isinstance(request, Sleep):
+                heapq.heappush(self._timers,
+                               (time.time() + request.seconds, next(self._counter), coroutine))
+                return
+            elif isinstance(request, (Readable, Writable)):
+                self._wait(self._readers if isinstance(request, Readable) else self._writers,
+                           _fileno(request.fileobj), coroutine)
+                return
+            else:
+                exc_info = (TypeError, TypeError(
+                    'Coroutines may only yield generators, Sleep, Readable or Writable, '
+                    'not {0!r}'.format(request)), None)
+
+    def _pop(self, coroutine):
+        """
+        Removes the innermost generator of a coroutine
+        :return: whether the coroutine has ended
+        """
+        coroutine.stack.pop()
+        if coroutine.stack:
+            return False
+        coroutine.ended = True
+        self._coroutines.pop(coroutine.task.id, None)
+        self._release_implementation(coroutine.task)
+        return True
+
+
+class _Coroutine(object):
+
+    def __init__(self, task, generator):
+        self.task = task
+        # Generators yielded by the coroutine are run on top of the generator which yielded them
+        self.stack = [generator]
+        self.waiting_for = None
+        self.ended = False
+
+    def close(self):
+        self.ended = True
+        while self.stack:
+            try:
+                self.stack.pop().close()
+            except BaseException:
+                pass
+
+
+def _fileno(fileobj):
+    return fileobj if isinstance(fileobj, (int, long)) else fileobj.fileno()
+
+
+def _socket_pair():
+    """
+    A connected pair of sockets (``socket.socketpair`` is not available on Windows)
+    """
+    server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    try:
+        server.bind(('localhost', 0))
+        server.listen(1)
+        writer = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        writer.connect(server.getsockname())
+        reader, _ = server.accept()
+    finally:
+        server.close()
+    reader.setblocking(False)
+    writer.setblocking(False)
+    return reader, writer
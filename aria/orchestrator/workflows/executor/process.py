@@ -29,13 +29,14 @@ script_dir = os.path.dirname(__file__)
 if script_dir in sys.path:
     sys.path.remove(script_dir)
 
+import collections
 import contextlib
 import io
+import itertools
 import threading
 import socket
 import struct
 import subprocess
-import tempfile
 import Queue
 import pickle
 
@@ -45,6 +46,7 @@ import aria
 from aria.orchestrator.workflows.executor import base
 from aria.storage import instrumentation
 from aria.extension import process_executor
+from aria.orchestrator import exceptions as orchestrator_exceptions
 from aria.utils import (
     imports,
     exceptions,
@@ -55,28 +57,86 @@ from aria.modeling import types as modeling_types
 
 _INT_FMT = 'I'
 _INT_SIZE = struct.calcsize(_INT_FMT)
+_WORKER_ARGUMENT = '--worker'
+# Seconds a terminated subprocess is given to exit before it is killed
+DEFAULT_TERMINATION_GRACE_PERIOD = 10
 UPDATE_TRACKED_CHANGES_FAILED_STR = \
     'Some changes failed writing to storage. For more info refer to the log.'
 
 
+class _PickleCodec(object):
+
+    @staticmethod
+    def dumps(obj):
+        return pickle.dumps(obj, pickle.HIGHEST_PROTOCOL)
+
+    @staticmethod
+    def loads(data):
+        return pickle.loads(data)
+
+
+# Codecs which may be used to encode the messages subprocesses send to the executor
+CODECS = {
+    'pickle': _PickleCodec,
+    'jsonpickle': jsonpickle
+}
+
+
+def _get_codec(codec_name):
+    if codec_name in CODECS:
+        return CODECS[codec_name]
+    # The codec should be importable by subprocesses, so other codecs are referenced by path
+    return imports.load_attribute(codec_name)
+
+
 class ProcessExecutor(base.BaseExecutor):
     """
-    Executor which runs tasks in a subprocess environment
+    Executor which runs tasks in a subprocess environment.
+
+    By default, every task is executed in a new subprocess. If ``pool_size`` is provided, tasks are
+    executed by long-lived worker processes instead, so the cost of starting an interpreter is paid
+    once per worker rather than once per task. Workers are pooled per plugin, so the environment
+    of each plugin remains isolated, with up to ``pool_size`` workers in each pool. Note that
+    extensions are installed once per worker, when it executes its first task.
+
+    Messages sent by subprocesses are encoded with ``codec``, which is either the name of one of
+    ``CODECS`` or the path to an object providing ``dumps`` and ``loads`` that subprocesses are
+    able to import.
+
+    Terminated tasks are sent a SIGTERM, and are killed if they are still running after
+    ``termination_grace_period`` seconds. A pooled worker which executes a terminated task is
+    terminated as well, and is replaced by a new worker once needed.
     """
 
-    def __init__(self, plugin_manager=None, python_path=None, *args, **kwargs):
+    def __init__(self, plugin_manager=None, python_path=None, pool_size=None, codec='pickle',
+                 termination_grace_period=DEFAULT_TERMINATION_GRACE_PERIOD, *args, **kwargs):
         super(ProcessExecutor, self).__init__(*args, **kwargs)
         self._plugin_manager = plugin_manager
+        self._termination_grace_period = termination_grace_period
+
+        # Codec used to encode messages sent over subprocesses connections
+        self._codec_name = codec
+        self._codec = _get_codec(codec)
 
         # Optional list of additional directories that should be added to
         # subprocesses python path
         self._python_path = python_path or []
 
+        # Maximum number of worker processes per plugin. None means a subprocess per task
+        self._pool_size = pool_size
+
+        # Worker processes and tasks waiting for an idle worker, keyed by plugin id
+        self._workers = collections.defaultdict(list)
+        self._waiting_tasks = collections.defaultdict(collections.deque)
+        self._workers_lock = threading.Lock()
+
         # Flag that denotes whether this executor has been stopped
         self._stopped = False
 
         # Contains reference to all currently running tasks
         self._tasks = {}
+        # The subprocesses of the running tasks (when tasks are not executed by pooled workers)
+        self._processes = {}
 
         self._request_handlers = {
             'started': self._handle_task_started_request,
@@ -91,8 +151,8 @@ class ProcessExecutor(base.BaseExecutor):
         self._server_socket.listen(10)
         self._server_port = self._server_socket.getsockname()[1]
 
-        # Used to send a "closed" message to the listener when this executor is closed
-        self._messenger = _Messenger(task_id=None, port=self._server_port)
+        # Connections are served concurrently, while the storage is shared by all of them
+        self._storage_lock = threading.RLock()
 
         # Queue object used by the listener thread to notify this constructed it has started
         # (see last line of this __init__ method)
@@ -112,29 +172,96 @@ class ProcessExecutor(base.BaseExecutor):
         self._stopped = True
         # Listener thread may be blocked on "accept" call. This will wake it up with an explicit
         # "closed" message
-        self._messenger.closed()
+        channel = _Channel(port=self._server_port, codec=self._codec)
+        try:
+            _Messenger(task_id=None, channel=channel).closed()
+        finally:
+            channel.close()
         self._server_socket.close()
         self._listener_thread.join(timeout=60)
+        # Workers exit once their input is closed
+        with self._workers_lock:
+            for workers in self._workers.values():
+                for worker in workers:
+                    worker.stop()
 
     def _execute(self, task):
         self._check_closed()
         self._tasks[task.id] = task
 
-        # Temporary file used to pass arguments to the started subprocess
-        file_descriptor, arguments_json_path = tempfile.mkstemp(prefix='executor-', suffix='.json')
-        os.close(file_descriptor)
-        with open(arguments_json_path, 'wb') as f:
-            f.write(pickle.dumps(self._create_arguments_dict(task)))
+        if self._pool_size:
+            self._execute_in_worker(task)
+            return
 
         env = self._construct_subprocess_env(task=task)
         # Asynchronously start the operation in a subprocess
-        subprocess.Popen(
-            '{0} {1} {2}'.format(sys.executable, __file__, arguments_json_path),
-            env=env,
-            shell=True)
+        process = subprocess.Popen([sys.executable, __file__], env=env, stdin=subprocess.PIPE)
+        # The arguments are passed through the subprocess input, which is then closed
+        process.stdin.write(pickle.dumps(self._create_arguments_dict(task),
+                                         pickle.HIGHEST_PROTOCOL))
+        process.stdin.close()
+        self._processes[task.id] = process
+
+    def terminate(self, task):
+        # The task may have already ended
+        task = self._tasks.pop(task.id, None)
+        if task is None:
+            return
+        if self._pool_size:
+            self._terminate_worker(task)
+        else:
+            process = self._processes.pop(task.id, None)
+            if process is not None:
+                _terminate_process(process, self._termination_grace_period)
+        self._task_failed(task,
+                          exception=orchestrator_exceptions.TaskAbortException('Task terminated'))
+
+    def _execute_in_worker(self, task):
+        pool_key = task.plugin_fk
+        with self._workers_lock:
+            # Workers may have died (e.g. an operation which called os._exit)
+            workers = self._workers[pool_key] = \
+                [worker for worker in self._workers[pool_key] if worker.is_alive()]
+            worker = next((worker for worker in workers if worker.task_id is None), None)
+            if worker is None and len(workers) < self._pool_size:
+                worker = _Worker(env=self._construct_subprocess_env(task=task))
+                workers.append(worker)
+            if worker is None:
+                self._waiting_tasks[pool_key].append(task)
+            else:
+                worker.execute(task.id, self._create_arguments_dict(task))
+
+    def _release_worker(self, task):
+        with self._workers_lock:
+            pool_key = task.plugin_fk
+            worker = next(
+                (worker for worker in self._workers[pool_key] if worker.task_id == task.id), None)
+            if worker is None:
+                return
+            worker.task_id = None
+            if self._waiting_tasks[pool_key] and not self._stopped:
+                next_task = self._waiting_tasks[pool_key].popleft()
+                worker.execute(next_task.id, self._create_arguments_dict(next_task))
+
+    def _terminate_worker(self, task):
+        with self._workers_lock:
+            pool_key = task.plugin_fk
+            if task in self._waiting_tasks[pool_key]:
+                self._waiting_tasks[pool_key].remove(task)
+                return
+            worker = next(
+                (worker for worker in self._workers[pool_key] if worker.task_id == task.id), None)
+            if worker is None:
+                return
+            self._workers[pool_key].remove(worker)
+            worker.terminate(self._termination_grace_period)
 
     def _remove_task(self, task_id):
-        return self._tasks.pop(task_id)
+        task = self._tasks.pop(task_id)
+        self._processes.pop(task_id, None)
+        if self._pool_size:
+            self._release_worker(task)
+        return task
 
     def _check_closed(self):
         if self._stopped:
@@ -146,11 +273,14 @@ class ProcessExecutor(base.BaseExecutor):
             'implementation': task.implementation,
             'operation_inputs': dict(inp.unwrap() for inp in task.inputs.values()),
             'port': self._server_port,
+            'codec': self._codec_name,
             'context': task.context.serialization_dict,
         }
 
     def _construct_subprocess_env(self, task):
-        env = os.environ.copy()
+        # Plugins whose operations are running in this process (e.g. by a ThreadExecutor) are not
+        # passed on to the subprocess
+        env = base.plugin_environment.original_environ()
 
         if task.plugin_fk and self._plugin_manager:
             # If this is a plugin operation,
@@ -168,92 +298,167 @@ class ProcessExecutor(base.BaseExecutor):
         self._listener_started.put(True)
         while not self._stopped:
             try:
-                with self._accept_request() as (request, response):
+                connection = self._server_socket.accept()[0]
+            except BaseException as e:
+                self.logger.debug('Error in process executor listener: {0}'.format(e))
+                continue
+            # Each subprocess keeps a single connection open, so connections are served by
+            # separate threads in order for subprocesses to report concurrently
+            connection_thread = threading.Thread(target=self._serve_connection,
+                                                 args=(connection,))
+            connection_thread.daemon = True
+            connection_thread.start()
+
+    def _serve_connection(self, connection):
+        with contextlib.closing(connection):
+            while True:
+                try:
+                    request = _recv_message(connection, codec=self._codec)
+                except BaseException as e:
+                    self.logger.debug('Error in process executor connection: {0}'.format(e))
+                    return
+                if request is None:
+                    # The subprocess closed its end of the connection
+                    return
+                response = {'request_id': request['request_id']}
+                try:
                     request_type = request['type']
                     if request_type == 'closed':
-                        break
+                        return
                     request_handler = self._request_handlers.get(request_type)
                     if not request_handler:
                         raise RuntimeError('Invalid request type: {0}'.format(request_type))
                     task_id = request['task_id']
                     request_handler(task_id=task_id, request=request, response=response)
-            except BaseException as e:
-                self.logger.debug('Error in process executor listener: {0}'.format(e))
-
-    @contextlib.contextmanager
-    def _accept_request(self):
-        with contextlib.closing(self._server_socket.accept()[0]) as connection:
-            message = _recv_message(connection)
-            response = {}
-            try:
-                yield message, response
-            except BaseException as e:
-                response['exception'] = exceptions.wrap_if_needed(e)
-                raise
-            finally:
-                _send_message(connection, response)
+                except BaseException as e:
+                    response['exception'] = exceptions.wrap_if_needed(e, codec=self._codec)
+                    self.logger.debug('Error in process executor listener: {0}'.format(e))
+                finally:
+                    _send_message(connection, response, codec=self._codec)
 
     def _handle_task_started_request(self, task_id, **kwargs):
         self._task_started(self._tasks[task_id])
 
     def _handle_task_succeeded_request(self, task_id, request, **kwargs):
         task = self._remove_task(task_id)
-        try:
-            self._apply_tracked_changes(task, request)
-        except BaseException as e:
-            e.message += UPDATE_TRACKED_CHANGES_FAILED_STR
-            self._task_failed(task, exception=e)
-        else:
-            self._task_succeeded(task)
+        # Reporting the task writes its state (and the state of its node), which other subprocesses
+        # must see together with its tracked changes
+        with self._storage_lock:
+            try:
+                self._apply_tracked_changes(task, request)
+            except BaseException as e:
+                e.message += UPDATE_TRACKED_CHANGES_FAILED_STR
+                self._task_failed(task, exception=e)
+            else:
+                self._task_succeeded(task)
 
     def _handle_task_failed_request(self, task_id, request, **kwargs):
         task = self._remove_task(task_id)
-        try:
-            self._apply_tracked_changes(task, request)
-        except BaseException as e:
-            e.message += 'Task failed due to {0}.'.format(request['exception']) + \
-                         UPDATE_TRACKED_CHANGES_FAILED_STR
-            self._task_failed(
-                task, exception=e, traceback=exceptions.get_exception_as_string(*sys.exc_info()))
-        else:
-            self._task_failed(task, exception=request['exception'], traceback=request['traceback'])
+        with self._storage_lock:
+            try:
+                self._apply_tracked_changes(task, request)
+            except BaseException as e:
+                e.message += 'Task failed due to {0}.'.format(request['exception']) + \
+                             UPDATE_TRACKED_CHANGES_FAILED_STR
+                self._task_failed(
+                    task,
+                    exception=e,
+                    traceback=exceptions.get_exception_as_string(*sys.exc_info()))
+            else:
+                self._task_failed(task,
+                                  exception=request['exception'],
+                                  traceback=request['traceback'])
 
     def _handle_apply_tracked_changes_request(self, task_id, request, response):
         task = self._tasks[task_id]
         try:
             self._apply_tracked_changes(task, request)
         except BaseException as e:
-            response['exception'] = exceptions.wrap_if_needed(e)
+            response['exception'] = exceptions.wrap_if_needed(e, codec=self._codec)
 
-    @staticmethod
-    def _apply_tracked_changes(task, request):
-        instrumentation.apply_tracked_changes(
-            tracked_changes=request['tracked_changes'],
-            new_instances=request['new_instances'],
-            model=task.context.model)
+    def _apply_tracked_changes(self, task, request):
+        with self._storage_lock:
+            instrumentation.apply_tracked_changes(
+                tracked_changes=request['tracked_changes'],
+                new_instances=request['new_instances'],
+                model=task.context.model)
+
+
+class _Worker(object):
+    """
+    A long-lived subprocess which executes the tasks written to its standard input, one at a time
+    """
+
+    def __init__(self, env):
+        self._process = subprocess.Popen([sys.executable, __file__, _WORKER_ARGUMENT],
+                                         env=env,
+                                         stdin=subprocess.PIPE)
+        # The id of the task the worker currently executes
+        self.task_id = None
+
+    def execute(self, task_id, arguments):
+        self.task_id = task_id
+        data = pickle.dumps(arguments, pickle.HIGHEST_PROTOCOL)
+        self._process.stdin.write(struct.pack(_INT_FMT, len(data)))
+        self._process.stdin.write(data)
+        self._process.stdin.flush()
 
+    def is_alive(self):
+        return self._process.poll() is None
 
-def _send_message(connection, message):
+    def terminate(self, grace_period):
+        _terminate_process(self._process, grace_period)
+
+    def stop(self):
+        try:
+            self._process.stdin.close()
+        except IOError:
+            pass
+
+
+def _terminate_process(process, grace_period):
+    def kill():
+        if process.poll() is None:
+            try:
+                process.kill()
+            except OSError:
+                # The process has just exited
+                pass
+
+    if process.poll() is not None:
+        return
+    try:
+        process.terminate()
+    except OSError:
+        return
+    kill_timer = threading.Timer(grace_period, kill)
+    kill_timer.daemon = True
+    kill_timer.start()
+
+
+def _send_message(connection, message, codec):
 
     # Packing the length of the entire msg using struct.pack.
     # This enables later reading of the content.
     def _pack(data):
         return struct.pack(_INT_FMT, len(data))
 
-    data = jsonpickle.dumps(message)
+    data = codec.dumps(message)
     msg_metadata = _pack(data)
-    connection.send(msg_metadata)
-    connection.sendall(data)
+    # A single write, since a second small write on a kept-alive connection is delayed until the
+    # first is acknowledged (Nagle's algorithm), which the other side delays in turn
+    connection.sendall(msg_metadata + data)
 
 
-def _recv_message(connection):
+def _recv_message(connection, codec):
     # Retrieving the length of the msg to come.
-    def _unpack(conn):
-        return struct.unpack(_INT_FMT, _recv_bytes(conn, _INT_SIZE))[0]
-
-    msg_metadata_len = _unpack(connection)
+    msg_metadata = _recv_bytes(connection, _INT_SIZE)
+    if not msg_metadata:
+        # The connection was closed by the other side
+        return None
+    msg_metadata_len = struct.unpack(_INT_FMT, msg_metadata)[0]
     msg = _recv_bytes(connection, msg_metadata_len)
-    return jsonpickle.loads(msg)
+    return codec.loads(msg)
 
 
 def _recv_bytes(connection, count):
@@ -268,11 +473,40 @@ def _recv_bytes(connection, count):
         count -= len(read)
 
 
+class _Channel(object):
+    """
+    A persistent connection to the executor, over which a subprocess sends all of its messages
+    """
+
+    def __init__(self, port, codec):
+        self.codec = codec
+        self._socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._socket.connect(('localhost', port))
+        self._request_ids = itertools.count()
+        # Operations may commit from several threads, while responses are read in order
+        self._lock = threading.Lock()
+
+    def request(self, message):
+        with self._lock:
+            request_id = next(self._request_ids)
+            message['request_id'] = request_id
+            _send_message(self._socket, message, codec=self.codec)
+            response = _recv_message(self._socket, codec=self.codec)
+        if response is None:
+            raise RuntimeError('Connection closed by executor')
+        if response['request_id'] != request_id:
+            raise RuntimeError('Mismatching response for request {0}'.format(request_id))
+        return response
+
+    def close(self):
+        self._socket.close()
+
+
 class _Messenger(object):
 
-    def __init__(self, task_id, port):
+    def __init__(self, task_id, channel):
         self.task_id = task_id
-        self.port = port
+        self.channel = channel
 
     def started(self):
         """Task started message"""
@@ -300,23 +534,17 @@ class _Messenger(object):
         self._send_message(type='closed')
 
     def _send_message(self, type, tracked_changes=None, new_instances=None, exception=None):
-        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        sock.connect(('localhost', self.port))
-        try:
-            _send_message(sock, {
-                'type': type,
-                'task_id': self.task_id,
-                'exception': exceptions.wrap_if_needed(exception),
-                'traceback': exceptions.get_exception_as_string(*sys.exc_info()),
-                'tracked_changes': tracked_changes or {},
-                'new_instances': new_instances or {}
-            })
-            response = _recv_message(sock)
-            response_exception = response.get('exception')
-            if response_exception:
-                raise response_exception
-        finally:
-            sock.close()
+        response = self.channel.request({
+            'type': type,
+            'task_id': self.task_id,
+            'exception': exceptions.wrap_if_needed(exception, codec=self.channel.codec),
+            'traceback': exceptions.get_exception_as_string(*sys.exc_info()),
+            'tracked_changes': tracked_changes or {},
+            'new_instances': new_instances or {}
+        })
+        response_exception = response.get('exception')
+        if response_exception:
+            raise response_exception
 
 
 def _patch_ctx(ctx, messenger, instrument):
@@ -352,28 +580,102 @@ def _patch_ctx(ctx, messenger, instrument):
     session.refresh = patched_refresh
 
 
+def _unpatch_ctx(ctx):
+    """
+    Restores the session patched by :func:`_patch_ctx`, and closes it, so that the storage can be
+    used by the next task
+    """
+    if not ctx.model:
+        return
+    session = ctx.model.node._session
+    for name in ('commit', 'rollback', 'refresh'):
+        session.__dict__.pop(name, None)
+    session.close()
+
+
 def _main():
-    arguments_json_path = sys.argv[1]
-    with open(arguments_json_path) as f:
-        arguments = pickle.loads(f.read())
+    arguments = pickle.loads(sys.stdin.read())
+
+    # This is required for the instrumentation work properly.
+    # See docstring of `remove_mutable_association_listener` for further details
+    modeling_types.remove_mutable_association_listener()
+
+    channel = _Channel(port=arguments['port'], codec=_get_codec(arguments['codec']))
+    try:
+        _run_task(arguments, channel=channel)
+    finally:
+        channel.close()
+
 
-    # arguments_json_path is a temporary file created by the parent process.
-    # so we remove it here
-    os.remove(arguments_json_path)
+def _worker_main():
+    modeling_types.remove_mutable_association_listener()
 
+    # The input is read by a separate thread, so the parent process is never blocked writing the
+    # next task while this process waits for the parent to handle the current one
+    arguments_queue = Queue.Queue()
+
+    def read_arguments():
+        while True:
+            data = sys.stdin.read(_INT_SIZE)
+            if not data:
+                # The parent process closed our input, which means the executor was closed
+                arguments_queue.put(None)
+                return
+            arguments_queue.put(pickle.loads(sys.stdin.read(struct.unpack(_INT_FMT, data)[0])))
+
+    reader_thread = threading.Thread(target=read_arguments)
+    reader_thread.daemon = True
+    reader_thread.start()
+
+    # All tasks executed by this worker report over the same connection, and use the same storages
+    channel = None
+    storages = {}
+    install_extensions = True
+    while True:
+        arguments = arguments_queue.get()
+        if arguments is None:
+            if channel:
+                channel.close()
+            return
+        channel = channel or _Channel(port=arguments['port'], codec=_get_codec(arguments['codec']))
+        try:
+            _run_task(arguments,
+                      channel=channel,
+                      install_extensions=install_extensions,
+                      storages=storages)
+        except BaseException as e:
+            # The worker should keep executing tasks, so the failure is reported instead of
+            # terminating the process
+            messenger = _Messenger(task_id=arguments['task_id'], channel=channel)
+            messenger.failed(exception=e, tracked_changes=None, new_instances=None)
+        # Extensions can only be installed once per process
+        install_extensions = False
+
+
+def _run_task(arguments, channel, install_extensions=True, storages=None):
+    """
+    :param storages: dict of the storages already created by the process, by their serialization,
+                     which are reused (and to which new storages are added) rather than created for
+                     the task
+    """
     task_id = arguments['task_id']
-    port = arguments['port']
-    messenger = _Messenger(task_id=task_id, port=port)
+    messenger = _Messenger(task_id=task_id, channel=channel)
 
     implementation = arguments['implementation']
     operation_inputs = arguments['operation_inputs']
     context_dict = arguments['context']
 
-    # This is required for the instrumentation work properly.
-    # See docstring of `remove_mutable_association_listener` for further details
-    modeling_types.remove_mutable_association_listener()
     try:
-        ctx = context_dict['context_cls'].deserialize_from_dict(**context_dict['context'])
+        context_kwargs = dict(context_dict['context'])
+        if storages is not None:
+            for name, create_storage in (('model_storage', aria.application_model_storage),
+                                         ('resource_storage', aria.application_resource_storage)):
+                if context_kwargs.get(name):
+                    key = (name, pickle.dumps(context_kwargs[name]))
+                    if key not in storages:
+                        storages[key] = create_storage(**context_kwargs[name])
+                    context_kwargs[name] = storages[key]
+        ctx = context_dict['context_cls'].deserialize_from_dict(**context_kwargs)
     except BaseException as e:
         messenger.failed(exception=e, tracked_changes=None, new_instances=None)
         return
@@ -383,7 +685,8 @@ def _main():
             messenger.started()
             _patch_ctx(ctx=ctx, messenger=messenger, instrument=instrument)
             task_func = imports.load_attribute(implementation)
-            aria.install_aria_extensions()
+            if install_extensions:
+                aria.install_aria_extensions()
             for decorate in process_executor.decorate():
                 task_func = decorate(task_func)
             task_func(ctx=ctx, **operation_inputs)
@@ -395,6 +698,11 @@ def _main():
                              new_instances=instrument.new_instances)
         finally:
             instrument.expunge_session()
+            if storages is not None:
+                _unpatch_ctx(ctx)
 
 if __name__ == '__main__':
-    _main()
+    if sys.argv[1:] == [_WORKER_ARGUMENT]:
+        _worker_main()
+    else:
+        _main()
@@ -22,20 +22,24 @@ import threading
 
 import sys
 
-from aria.utils import imports, exceptions
+from aria.utils import exceptions
 
-from .base import BaseExecutor
+from .base import BaseExecutor, PluginLoaderMixin
 
 
-class ThreadExecutor(BaseExecutor):
+class ThreadExecutor(PluginLoaderMixin, BaseExecutor):
     """
-    Executor which runs tasks in a separate thread. It's easier writing tests
-    using this executor rather than the full blown subprocess executor.
-    Note: This executor is not capable of running plugin operations.
+    Executor which runs tasks in a pool of threads. It is well suited for I/O bound operations
+    (e.g. SSH or REST calls), as a thread is much cheaper than the subprocess of the
+    ProcessExecutor. It's also easier writing tests using this executor rather than the full blown
+    subprocess executor.
+
+    Plugin operations can be executed if a ``plugin_manager`` is provided (see
+    :class:`PluginLoaderMixin`).
     """
 
-    def __init__(self, pool_size=1, *args, **kwargs):
-        super(ThreadExecutor, self).__init__(*args, **kwargs)
+    def __init__(self, pool_size=1, plugin_manager=None, *args, **kwargs):
+        super(ThreadExecutor, self).__init__(plugin_manager=plugin_manager, *args, **kwargs)
         self._stopped = False
         self._queue = Queue.Queue()
         self._pool = []
@@ -50,19 +54,29 @@ class ThreadExecutor(BaseExecutor):
         self._queue.put(task)
 
     def close(self):
+        if self._stopped:
+            return
         self._stopped = True
+        # Wake up the idle threads, so they can notice the executor was closed
+        for _ in self._pool:
+            self._queue.put(None)
         for thread in self._pool:
             thread.join()
 
     def _processor(self):
-        while not self._stopped:
+        while True:
+            task = self._queue.get()
+            if self._stopped:
+                return
             try:
-                task = self._queue.get(timeout=1)
                 self._task_started(task)
                 try:
-                    task_func = imports.load_attribute(task.implementation)
-                    inputs = dict(inp.unwrap() for inp in task.inputs.values())
-                    task_func(ctx=task.context, **inputs)
+                    task_func = self._load_implementation(task)
+                    try:
+                        inputs = dict(inp.unwrap() for inp in task.inputs.values())
+                        task_func(ctx=task.context, **inputs)
+                    finally:
+                        self._release_implementation(task)
                     self._task_succeeded(task)
                 except BaseException as e:
                     self._task_failed(task,
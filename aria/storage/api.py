@@ -82,6 +82,16 @@ class ModelAPI(StorageAPI):
         """
         raise NotImplementedError('Subclass must implement abstract store method')
 
+    def put_all(self, entries, **kwargs):
+        """
+        Store several entries in storage at once
+
+        :param entries:
+        :param kwargs:
+        :return:
+        """
+        raise NotImplementedError('Subclass must implement abstract put_all method')
+
     def delete(self, entry_id, **kwargs):
         """
         Delete entry from storage.
@@ -158,6 +158,18 @@ class ModelStorage(Storage):
         self.registered[model_name].create()
         self.logger.debug('setup {name} in storage {self!r}'.format(name=model_name, self=self))
 
+    def transaction(self):
+        """
+        A unit of work of all the models, committed in a single transaction (see
+        :meth:`aria.storage.sql_mapi.SQLAlchemyModelAPI.transaction`)::
+
+            with model_storage.transaction():
+                model_storage.node.put(node)
+                model_storage.task.put(task)
+        """
+        # All the MAPIs share the same session
+        return next(iter(self.registered.values())).transaction()
+
     def drop(self):
         """
         Drop all the tables from the model.
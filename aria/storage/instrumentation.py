@@ -212,13 +212,21 @@ class _Value(object):
     def __hash__(self):
         return hash((self.initial, self.current))
 
+    # Values are serialized for every tracked attribute, so their state is kept as a plain tuple
+    def __getstate__(self):
+        return self.initial, self.current
+
+    def __setstate__(self, state):
+        self.initial, self.current = state
+
     @property
     def dict(self):
         return {'initial': self.initial, 'current': self.current}.copy()
 
 
 def apply_tracked_changes(tracked_changes, new_instances, model):
-    """Write tracked changes back to the database using provided model storage
+    """Write tracked changes back to the database using provided model storage, in a single
+    transaction
 
     :param tracked_changes: The ``tracked_changes`` attribute of the instrumentation context
                             returned by calling ``track_changes()``
@@ -226,31 +234,9 @@ def apply_tracked_changes(tracked_changes, new_instances, model):
     """
     successfully_updated_changes = dict()
     try:
-        # handle instance updates
-        for mapi_name, tracked_instances in tracked_changes.items():
-            successfully_updated_changes[mapi_name] = dict()
-            mapi = getattr(model, mapi_name)
-            for instance_id, tracked_attributes in tracked_instances.items():
-                successfully_updated_changes[mapi_name][instance_id] = dict()
-                instance = None
-                for attribute_name, value in tracked_attributes.items():
-                    if value.initial != value.current:
-                        instance = instance or mapi.get(instance_id)
-                        setattr(instance, attribute_name, value.current)
-                if instance:
-                    _validate_version_id(instance, mapi)
-                    mapi.update(instance)
-                    successfully_updated_changes[mapi_name][instance_id] = [
-                        v.dict for v in tracked_attributes.values()]
-
-        # Handle new instances
-        for mapi_name, new_instance in new_instances.items():
-            successfully_updated_changes[mapi_name] = dict()
-            mapi = getattr(model, mapi_name)
-            for new_instance_kwargs in new_instance.values():
-                instance = mapi.model_cls(**new_instance_kwargs)
-                mapi.put(instance)
-                successfully_updated_changes[mapi_name][instance.id] = new_instance_kwargs
+        with model.transaction():
+            _apply_tracked_changes(tracked_changes, new_instances, model,
+                                   successfully_updated_changes)
     except BaseException:
         for key, value in successfully_updated_changes.items():
             if not value:
@@ -258,12 +244,40 @@ def apply_tracked_changes(tracked_changes, new_instances, model):
         # TODO: if the successful has _STUB, the logging fails because it can't serialize the object
         model.logger.error(
             'Registering all the changes to the storage has failed. {0}'
-            'The successful updates were: {0} '
+            'The updates which were rolled back are: {0} '
             '{1}'.format(os.linesep, json.dumps(successfully_updated_changes, indent=4)))
 
         raise
 
 
+def _apply_tracked_changes(tracked_changes, new_instances, model, successfully_updated_changes):
+    # handle instance updates
+    for mapi_name, tracked_instances in tracked_changes.items():
+        successfully_updated_changes[mapi_name] = dict()
+        mapi = getattr(model, mapi_name)
+        for instance_id, tracked_attributes in tracked_instances.items():
+            successfully_updated_changes[mapi_name][instance_id] = dict()
+            instance = None
+            for attribute_name, value in tracked_attributes.items():
+                if value.initial != value.current:
+                    instance = instance or mapi.get(instance_id)
+                    setattr(instance, attribute_name, value.current)
+            if instance:
+                _validate_version_id(instance, mapi)
+                mapi.update(instance)
+                successfully_updated_changes[mapi_name][instance_id] = [
+                    v.dict for v in tracked_attributes.values()]
+
+    # Handle new instances
+    for mapi_name, new_instance in new_instances.items():
+        successfully_updated_changes[mapi_name] = dict()
+        mapi = getattr(model, mapi_name)
+        for new_instance_kwargs in new_instance.values():
+            instance = mapi.model_cls(**new_instance_kwargs)
+            mapi.put(instance)
+            successfully_updated_changes[mapi_name][instance.id] = new_instance_kwargs
+
+
 def _validate_version_id(instance, mapi):
     version_id = sqlalchemy.inspect(instance).committed_state.get(_VERSION_ID_COL)
     # There are two version conflict code paths:
@@ -15,12 +15,23 @@
 """
 SQLAlchemy based MAPI
 """
+import base64
+import json
 import os
 import platform
+from contextlib import contextmanager
+from datetime import datetime
+from functools import partial
 
 from sqlalchemy import (
+    and_,
     create_engine,
+    event,
+    func,
+    inspect,
+    or_,
     orm,
+    pool,
 )
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.orm.exc import StaleDataError
@@ -38,6 +49,31 @@ _predicates = {'ge': '__ge__',
                'eq': '__eq__',
                'ne': '__ne__'}
 
+# Relationship loading strategies, by the names accepted by the ``load`` argument of the queries
+_loaders = {'joined': 'joinedload',
+            'subquery': 'subqueryload',
+            'lazy': 'lazyload'}
+
+# The format of datetime values in pagination cursors
+_CURSOR_DATETIME_FORMAT = '%Y-%m-%dT%H:%M:%S.%f'
+
+# The key in the session info of the number of transactions the session is in
+_TRANSACTION_DEPTH = 'aria_transaction_depth'
+
+# SQLite pragmas applied to every connection by ``init_storage``:
+# - readers do not block writers and vice versa, and commits append to the write-ahead log
+# - the log is only synced on checkpoints, which is safe against application crashes (only a power
+#   loss may lose the latest commits)
+# - connections wait for locks held by other processes rather than fail at once
+# - a larger page cache, and reads through memory mapping
+SQLITE_PRAGMAS = OrderedDict((
+    ('journal_mode', 'WAL'),
+    ('synchronous', 'NORMAL'),
+    ('busy_timeout', 30000),                # milliseconds
+    ('cache_size', -64000),                 # kibibytes
+    ('mmap_size', 256 * 1024 * 1024),       # bytes
+))
+
 
 class SQLAlchemyModelAPI(api.ModelAPI):
     """
@@ -52,10 +88,15 @@ class SQLAlchemyModelAPI(api.ModelAPI):
         self._engine = engine
         self._session = session
 
-    def get(self, entry_id, include=None, **kwargs):
+    def get(self, entry_id, include=None, load=None, load_only=None, **kwargs):
         """Return a single result based on the model class and element ID
+
+        :param load: An optional dict of relationship paths (e.g. ``interfaces.operations``) to
+        their loading strategy (``joined``, ``subquery`` or ``lazy``)
+        :param load_only: An optional list of column names, so that only these columns are loaded
+        (the others are loaded once accessed)
         """
-        query = self._get_query(include, {'id': entry_id})
+        query = self._get_query(include, {'id': entry_id}, load=load, load_only=load_only)
         result = query.first()
 
         if not result:
@@ -65,9 +106,10 @@ class SQLAlchemyModelAPI(api.ModelAPI):
             )
         return result
 
-    def get_by_name(self, entry_name, include=None, **kwargs):
+    def get_by_name(self, entry_name, include=None, load=None, load_only=None, **kwargs):
         assert hasattr(self.model_cls, 'name')
-        result = self.list(include=include, filters={'name': entry_name})
+        result = self.list(include=include, filters={'name': entry_name}, load=load,
+                           load_only=load_only)
         if not result:
             raise exceptions.NotFoundError(
                 'Requested {0} with name `{1}` was not found'
@@ -86,24 +128,41 @@ class SQLAlchemyModelAPI(api.ModelAPI):
              filters=None,
              pagination=None,
              sort=None,
+             load=None,
+             load_only=None,
              **kwargs):
-        query = self._get_query(include, filters, sort)
+        """Return a (possibly empty) list of `model_class` results
 
-        results, total, size, offset = self._paginate(query, pagination)
+        :param pagination: An optional dict with either ``size`` and
+        ``offset`` keys, or ``size`` and ``cursor`` keys (see
+        :meth:`_paginate_by_cursor`), and an optional ``count`` key: True
+        to count the total number of results, ``approximate`` to estimate it
+        (see :meth:`_count`), or False not to count them
+        """
+        keyset = bool(pagination) and 'cursor' in pagination
+        if keyset:
+            sort = self._get_keyset_sort(sort)
+        query = self._get_query(include, filters, sort, load, load_only)
+
+        if keyset:
+            results, total, size, cursor = self._paginate_by_cursor(query, pagination, sort)
+            metadata = dict(total=total, size=size, cursor=cursor)
+        else:
+            results, total, size, offset = self._paginate(query, pagination)
+            metadata = dict(total=total, size=size, offset=offset)
 
-        return ListResult(
-            dict(total=total, size=size, offset=offset),
-            results
-        )
+        return ListResult(metadata, results)
 
     def iter(self,
              include=None,
              filters=None,
              sort=None,
+             load=None,
+             load_only=None,
              **kwargs):
         """Return a (possibly empty) list of `model_class` results
         """
-        return iter(self._get_query(include, filters, sort))
+        return iter(self._get_query(include, filters, sort, load, load_only))
 
     def put(self, entry, **kwargs):
         """Create a `model_class` instance from a serializable `model` object
@@ -117,10 +176,25 @@ class SQLAlchemyModelAPI(api.ModelAPI):
         self._safe_commit()
         return entry
 
-    def delete(self, entry, **kwargs):
+    def put_all(self, entries, **kwargs):
+        """Store several `model_class` instances in a single transaction
+
+        :param entries: An iterable of `model_class` instances
+        :return: The list of stored instances
+        """
+        entries = list(entries)
+        self._session.add_all(entries)
+        self._safe_commit()
+        return entries
+
+    def delete(self, entry, load=None, **kwargs):
         """Delete a single result based on the model class and element ID
+
+        :param load: An optional dict of the relationships to load before the deletion (see
+        :meth:`get`), so that they are accessible on the deleted entry. By default, all the
+        relationships are loaded, one at a time.
         """
-        self._load_relationships(entry)
+        self._load_relationships(entry, load)
         self._session.delete(entry)
         self._safe_commit()
         return entry
@@ -132,16 +206,47 @@ class SQLAlchemyModelAPI(api.ModelAPI):
         """
         return self.put(entry)
 
-    def refresh(self, entry):
+    def refresh(self, entry, load=None):
         """Reload the instance with fresh information from the DB
 
         :param entry: Instance to be re-loaded from the DB
+        :param load: An optional dict of the relationships to reload (see :meth:`get`), together
+        with the columns in a single query. The other relationships are reloaded once accessed.
+        By default, all the relationships are reloaded, one at a time.
         :return: The refreshed instance
         """
-        self._session.refresh(entry)
-        self._load_relationships(entry)
+        if load is None:
+            self._session.refresh(entry)
+            self._load_relationships(entry)
+        else:
+            self._session.query(type(entry)) \
+                .populate_existing() \
+                .options(*self._get_loader_options(load)) \
+                .filter_by(id=entry.id) \
+                .one()
         return entry
 
+    @contextmanager
+    def transaction(self):
+        """
+        A unit of work: the changes made by all the MAPIs sharing this session (on the current
+        thread) are committed once the unit of work ends, rather than by each ``put``, ``update``
+        and ``delete``. If an error is raised, all the changes are rolled back. Units of work may
+        be nested, in which case the changes are committed by the outermost one.
+        """
+        info = self._session.info
+        info[_TRANSACTION_DEPTH] = info.get(_TRANSACTION_DEPTH, 0) + 1
+        try:
+            yield
+        except BaseException:
+            info[_TRANSACTION_DEPTH] -= 1
+            if not info[_TRANSACTION_DEPTH]:
+                self._session.rollback()
+            raise
+        info[_TRANSACTION_DEPTH] -= 1
+        if not info[_TRANSACTION_DEPTH]:
+            self._safe_commit()
+
     def _destroy_connection(self):
         pass
 
@@ -156,6 +261,19 @@ class SQLAlchemyModelAPI(api.ModelAPI):
             # created at runtime).
             self.model_cls.metadata.create_all(bind=self._engine, checkfirst=checkfirst)
 
+        if checkfirst:
+            # The table may have been created by an earlier version, without the indexes added to
+            # the model since
+            self._create_missing_indexes()
+
+    def _create_missing_indexes(self):
+        table = self.model_cls.__table__
+        existing_names = set(index['name']
+                             for index in inspect(self._engine).get_indexes(table.name))
+        for index in table.indexes:
+            if index.name not in existing_names:
+                index.create(self._engine)
+
     def drop(self):
         """
         Drop the table from the storage.
@@ -166,9 +284,16 @@ class SQLAlchemyModelAPI(api.ModelAPI):
     def _safe_commit(self):
         """Try to commit changes in the session. Roll back if exception raised
         Excepts SQLAlchemy errors and rollbacks if they're caught
+
+        Within a unit of work (see :meth:`transaction`), the changes are only flushed, so they are
+        visible to the following queries (and e.g. new instances get their ids), but are committed
+        by the unit of work.
         """
         try:
-            self._session.commit()
+            if self._session.info.get(_TRANSACTION_DEPTH):
+                self._session.flush()
+            else:
+                self._session.commit()
         except StaleDataError as e:
             self._session.rollback()
             raise exceptions.StorageError('Version conflict: {0}'.format(str(e)))
@@ -261,7 +386,9 @@ class SQLAlchemyModelAPI(api.ModelAPI):
     def _get_query(self,
                    include=None,
                    filters=None,
-                   sort=None):
+                   sort=None,
+                   load=None,
+                   load_only=None):
         """Get an SQL query object based on the params passed
 
         :param model_class: SQL DB table class
@@ -271,6 +398,9 @@ class SQLAlchemyModelAPI(api.ModelAPI):
         of such values)
         :param sort: An optional dictionary where keys are column names to
         sort by, and values are the order (asc/desc)
+        :param load: An optional dictionary where keys are relationship paths
+        to load, and values are their loading strategies
+        :param load_only: An optional list of the only column names to load
         :return: A sorted and filtered query with only the relevant
         columns
         """
@@ -282,8 +412,35 @@ class SQLAlchemyModelAPI(api.ModelAPI):
         query = self._get_base_query(include, joins)
         query = self._filter_query(query, filters)
         query = self._sort_query(query, sort)
+        if load or load_only:
+            query = query.options(*self._get_loader_options(load, load_only))
         return query
 
+    @staticmethod
+    def _get_loader_options(load=None, load_only=None):
+        """Get the query options which load the relationships and columns
+
+        :param load: A dictionary where keys are relationship paths, whose
+        names are separated by dots, and values are their loading strategies
+        :param load_only: A list of the only column names to load
+        :return: A list of SQLAlchemy loader options
+        """
+        options = []
+        for path, strategy in (load or {}).items():
+            if strategy not in _loaders:
+                raise exceptions.StorageError(
+                    "{0} is not a valid loading strategy. Valid strategies are {1}"
+                    .format(strategy, ', '.join(_loaders.keys())))
+            # The relationships leading to the last one keep their own strategy
+            names = path.split('.')
+            option = orm
+            for name in names[:-1]:
+                option = option.defaultload(name)
+            options.append(getattr(option, _loaders[strategy])(names[-1]))
+        if load_only:
+            options.append(orm.load_only(*load_only))
+        return options
+
     @staticmethod
     def _convert_operands(filters):
         for column, conditions in filters.items():
@@ -348,8 +505,7 @@ class SQLAlchemyModelAPI(api.ModelAPI):
             # Put a label on the remote attribute with the name of the column
             return column.remote_attr.label(column_name)
 
-    @staticmethod
-    def _paginate(query, pagination):
+    def _paginate(self, query, pagination):
         """Paginate the query by size and offset
 
         :param query: Current SQLAlchemy query object
@@ -363,23 +519,127 @@ class SQLAlchemyModelAPI(api.ModelAPI):
         if pagination:
             size = pagination.get('size', 0)
             offset = pagination.get('offset', 0)
-            total = query.order_by(None).count()  # Fastest way to count
+            total = self._count(query, pagination.get('count', True))
             results = query.limit(size).offset(offset).all()
             return results, total, size, offset
         else:
             results = query.all()
             return results, len(results), 0, 0
 
+    def _paginate_by_cursor(self, query, pagination, sort):
+        """Paginate the query by size and cursor (keyset pagination). Rather
+        than skipping the results of the previous pages, a page starts right
+        after the sort values of the last result of the previous page, which
+        are described by its cursor. Therefore, pages are as fast to get no
+        matter how far they are, but the sort columns must not be null.
+
+        :param query: Current SQLAlchemy query object, sorted by `sort`
+        :param pagination: A dict with size and cursor keys, where the cursor
+        of the first page is None
+        :param sort: The sort of the query, which must end with the id
+        :return: A tuple with four elements:
+        - results: up to `size` items following the cursor
+        - the total count of items, if requested [default: None]
+        - `size`
+        - the cursor of the next page, or None if this is the last page
+        """
+        size = pagination.get('size', 0)
+        total = self._count(query, pagination.get('count', False))
+        if pagination['cursor']:
+            values = self._decode_cursor(pagination['cursor'], sort)
+            query = query.filter(self._get_keyset_filter(sort, values))
+        if size:
+            # Getting an extra result tells whether there is a next page
+            results = query.limit(size + 1).all()
+        else:
+            results = query.all()
+        if not size or len(results) <= size:
+            return results, total, size, None
+        results = results[:size]
+        values = [getattr(results[-1], column_name) for column_name in sort]
+        return results, total, size, self._encode_cursor(sort, values)
+
+    def _count(self, query, count):
+        """Count the results of a query
+
+        :param count: True to count the results, ``approximate`` to estimate
+        their number by the span of their ids (which is exact if they were
+        stored one after the other, and an overestimate otherwise, but does
+        not require scanning them), or False not to count them
+        :return: The count, or None if not counted
+        """
+        if not count:
+            return None
+        query = query.order_by(None).enable_eagerloads(False)
+        if count == 'approximate':
+            id_column = self.model_cls.id
+            first_id, last_id = query.with_entities(func.min(id_column),
+                                                    func.max(id_column)).one()
+            return 0 if first_id is None else last_id - first_id + 1
+        return query.count()
+
     @staticmethod
-    def _load_relationships(instance):
-        """A helper method used to overcome a problem where the relationships
-        that rely on joins aren't being loaded automatically
+    def _get_keyset_sort(sort=None):
+        """Add the id to the sort, so that the results have a total order
+        (in the direction of the last sort column)
+        """
+        sort = OrderedDict(sort or {})
+        if 'id' not in sort:
+            sort['id'] = sort.values()[-1] if sort else 'asc'
+        return sort
+
+    def _get_keyset_filter(self, sort, values):
+        """Get the filter of the results which follow the sort values
         """
-        for rel in instance.__mapper__.relationships:
-            getattr(instance, rel.key)
+        columns = [self._get_column(column_name) for column_name in sort]
+        orders = sort.values()
+        clauses = []
+        for i, column in enumerate(columns):
+            predicate = '__lt__' if orders[i] == 'desc' else '__gt__'
+            clauses.append(and_(*[previous_column == value
+                                  for previous_column, value in zip(columns[:i], values[:i])] +
+                                 [getattr(column, predicate)(values[i])]))
+        return or_(*clauses)
+
+    @staticmethod
+    def _encode_cursor(sort, values):
+        values = [{'datetime': value.strftime(_CURSOR_DATETIME_FORMAT)}
+                  if isinstance(value, datetime) else value
+                  for value in values]
+        return base64.urlsafe_b64encode(json.dumps([sort.items(), values]))
+
+    @staticmethod
+    def _decode_cursor(cursor, sort):
+        try:
+            cursor_sort, values = json.loads(base64.urlsafe_b64decode(str(cursor)))
+        except (TypeError, ValueError):
+            raise exceptions.StorageError('Invalid pagination cursor: {0}'.format(cursor))
+        if [tuple(column_order) for column_order in cursor_sort] != sort.items():
+            raise exceptions.StorageError(
+                'Pagination cursor {0} belongs to a list of a different sort'.format(cursor))
+        return [datetime.strptime(value['datetime'], _CURSOR_DATETIME_FORMAT)
+                if isinstance(value, dict) else value
+                for value in values]
 
+    def _load_relationships(self, instance, load=None):
+        """A helper method used to overcome a problem where the relationships
+        that rely on joins aren't being loaded automatically
 
-def init_storage(base_dir, filename='db.sqlite'):
+        :param load: An optional dictionary of the relationships to load in a
+        single query (see :meth:`get`), rather than all of them one at a time
+        """
+        if load is None:
+            for rel in instance.__mapper__.relationships:
+                getattr(instance, rel.key)
+        elif load:
+            # The relationships which are not loaded yet are populated on the instance
+            self._session.query(type(instance)) \
+                .options(*self._get_loader_options(load)) \
+                .filter_by(id=instance.id) \
+                .all()
+
+
+def init_storage(base_dir, filename='db.sqlite', pragmas=None):
     """
     A builtin ModelStorage initiator.
     Creates a sqlalchemy engine and a session to be passed to the mapi.
@@ -388,6 +648,8 @@ def init_storage(base_dir, filename='db.sqlite'):
     location of the db file, and an option filename. This would create an sqlite db.
     :param base_dir: the dir of the db
     :param filename: the db file name.
+    :param pragmas: dict of the SQLite pragmas applied to every connection. Defaults to
+                    ``SQLITE_PRAGMAS``, while an empty dict keeps the SQLite defaults.
     :return:
     """
     uri = 'sqlite:///{platform_char}{path}'.format(
@@ -397,13 +659,28 @@ def init_storage(base_dir, filename='db.sqlite'):
 
         path=os.path.join(base_dir, filename))
 
-    engine = create_engine(uri)
+    # Connections are pooled (rather than opened per session), so they keep their page cache
+    engine = create_engine(uri,
+                           connect_args={'check_same_thread': False},
+                           poolclass=pool.QueuePool)
+    pragmas = SQLITE_PRAGMAS if pragmas is None else pragmas
+    if pragmas:
+        event.listen(engine, 'connect', partial(_set_pragmas, pragmas=pragmas))
     session_factory = orm.sessionmaker(bind=engine)
     session = orm.scoped_session(session_factory=session_factory)
 
     return dict(engine=engine, session=session)
 
 
+def _set_pragmas(dbapi_connection, connection_record, pragmas):                                    # pylint: disable=unused-argument
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in pragmas.items():
+            cursor.execute('PRAGMA {0} = {1}'.format(name, value))
+    finally:
+        cursor.close()
+
+
 class ListResult(list):
     """
     a ListResult contains results about the requested items.
@@ -108,9 +108,13 @@ class _WrappedException(Exception):
         self.exception_str = exception_str
 
 
-def wrap_if_needed(exception):
+def wrap_if_needed(exception, codec=jsonpickle):
+    """
+    Wraps the exception if it cannot be serialized and deserialized by ``codec``, which is any
+    object providing ``dumps`` and ``loads`` (jsonpickle by default).
+    """
     try:
-        jsonpickle.loads(jsonpickle.dumps(exception))
+        codec.loads(codec.dumps(exception))
         return exception
     except BaseException:
         return _WrappedException(type(exception).__name__, str(exception))
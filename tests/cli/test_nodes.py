@@ -17,6 +17,7 @@ import pytest
 import mock
 
 from aria.cli.env import _Environment
+from aria.storage.sql_mapi import ListResult
 
 from .base_test import (  # pylint: disable=unused-import
     TestCliBase,
@@ -73,7 +74,8 @@ class TestNodesList(TestCliBase):
 
         nodes_list = mock_storage.node.list
         nodes_list.assert_called_once_with(sort={sort_by_in_output: order_in_output},
-                                           filters={'service': mock.ANY})
+                                           filters={'service': mock.ANY},
+                                           pagination=None)
         assert 'Nodes:' in self.logger_output_string
         assert 'test_s' in self.logger_output_string
         assert 'test_n' in self.logger_output_string
@@ -95,7 +97,23 @@ class TestNodesList(TestCliBase):
 
         nodes_list = mock_storage.node.list
         nodes_list.assert_called_once_with(sort={sort_by_in_output: order_in_output},
-                                           filters={})
+                                           filters={},
+                                           pagination=None)
         assert 'Nodes:' in self.logger_output_string
         assert 'test_s' in self.logger_output_string
         assert 'test_n' in self.logger_output_string
+
+    def test_list_page(self, monkeypatch, mock_storage):
+
+        monkeypatch.setattr(_Environment, 'model_storage', mock_storage)
+        m = mock.MagicMock(return_value=ListResult(
+            dict(total=None, size=1, cursor='next_cursor'),
+            [mock_models.create_node_with_dependencies()]))
+        monkeypatch.setattr(mock_storage.node, 'list', m)
+        self.invoke('nodes list --page-size 1 --cursor test_cursor')
+
+        m.assert_called_once_with(sort={'service_name': 'asc'},
+                                  filters={},
+                                  pagination=dict(size=1, cursor='test_cursor'))
+        assert 'test_n' in self.logger_output_string
+        assert '--cursor next_cursor' in self.logger_output_string
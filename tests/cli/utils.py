@@ -17,6 +17,8 @@ import logging
 
 from mock import MagicMock
 
+from aria.storage.sql_mapi import ListResult
+
 from ..mock import models as mock_models
 
 
@@ -98,4 +100,5 @@ class MockNodeTemplateStorage(object):
 class MockNodeStorage(object):
     def __init__(self):
         self.get = MagicMock(return_value=mock_models.create_node_with_dependencies())
-        self.list = MagicMock(return_value=[mock_models.create_node_with_dependencies()])
+        self.list = MagicMock(return_value=ListResult(
+            dict(total=1, size=0, offset=0), [mock_models.create_node_with_dependencies()]))
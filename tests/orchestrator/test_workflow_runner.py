@@ -167,6 +167,37 @@ def test_execution_model_creation(request, service, model):
         assert workflow_runner.execution.inputs == dict()
 
 
+def test_resume_execution(request, service, model):
+    mock_workflow = _setup_mock_workflow_in_service(request)
+    interrupted_execution = models.Execution(
+        service=service,
+        status=models.Execution.STARTED,
+        workflow_name=mock_workflow,
+        inputs={})
+    model.execution.put(interrupted_execution)
+
+    with mock.patch('aria.orchestrator.workflow_runner.Engine') as mock_engine_cls:
+        workflow_runner = _create_workflow_runner(request, 'install',
+                                                  execution_id=interrupted_execution.id)
+        _, engine_kwargs = mock_engine_cls.call_args
+        assert engine_kwargs['resume']
+        # The workflow of the execution is resumed, rather than the one the runner is given
+        assert engine_kwargs['workflow_context'].workflow_name == mock_workflow
+        assert workflow_runner.execution_id == interrupted_execution.id
+        assert workflow_runner.execution.workflow_name == mock_workflow
+        assert len(model.execution.list()) == 1
+
+
+def test_resume_ended_execution(request, service, model):
+    ended_execution = models.Execution(
+        service=service,
+        status=models.Execution.SUCCEEDED,
+        workflow_name='install')
+    model.execution.put(ended_execution)
+    with pytest.raises(exceptions.ExecutionNotResumableError):
+        _create_workflow_runner(request, 'install', execution_id=ended_execution.id)
+
+
 def test_execution_inputs_override_workflow_inputs(request):
     wf_inputs = {'input1': 'value1', 'input2': 'value2', 'input3': 5}
     mock_workflow = _setup_mock_workflow_in_service(
@@ -266,7 +297,7 @@ def _setup_mock_workflow_in_service(request, inputs=None):
 
 
 def _create_workflow_runner(request, workflow_name, inputs=None, executor=None,
-                            task_max_attempts=None, task_retry_interval=None):
+                            task_max_attempts=None, task_retry_interval=None, execution_id=None):
     # helper method for instantiating a workflow runner
     service_id = request.getfuncargvalue('service').id
     model = request.getfuncargvalue('model')
@@ -289,4 +320,5 @@ def _create_workflow_runner(request, workflow_name, inputs=None, executor=None,
         model_storage=model,
         resource_storage=resource,
         plugin_manager=plugin_manager,
+        execution_id=execution_id,
         **task_configuration_kwargs)
@@ -184,6 +184,18 @@ class TestTaskGraphGraphTraversal(object):
         tasks = [t for t in graph.tasks]
         assert set(tasks) == set([task, other_task])
 
+    def test_topological_order_follows_modifications(self, graph):
+        task = MockTask()
+        dependent_task = MockTask()
+        graph.add_tasks(task, dependent_task)
+        graph.add_dependency(dependent_task, task)
+        assert list(graph.topological_order()) == [dependent_task, task]
+        assert list(graph.topological_order(reverse=True)) == [task, dependent_task]
+
+        graph.remove_dependency(dependent_task, task)
+        graph.add_dependency(task, dependent_task)
+        assert list(graph.topological_order()) == [task, dependent_task]
+
     def test_get_dependents(self, graph):
         task = MockTask()
         dependent_task_1 = MockTask()
@@ -321,6 +333,27 @@ class TestTaskGraphDependencies(object):
         assert graph.has_dependency(group_tasks[1], task) is True
         assert graph.has_dependency(group_tasks[2], task) is True
 
+    def test_add_dependencies(self, graph):
+        task = MockTask()
+        group_tasks = [MockTask() for _ in xrange(3)]
+        graph.add_tasks(task)
+        graph.add_tasks(*group_tasks)
+        graph.add_dependencies([(group_tasks[0], task), (group_tasks[1:], group_tasks[0])])
+        assert graph.has_dependency(group_tasks[0], task) is True
+        assert graph.has_dependency(group_tasks[1], group_tasks[0]) is True
+        assert graph.has_dependency(group_tasks[2], group_tasks[0]) is True
+        assert graph.has_dependency(group_tasks[2], task) is False
+
+    def test_add_dependencies_nonexistent_task(self, graph):
+        task = MockTask()
+        other_task = MockTask()
+        task_not_in_graph = MockTask()
+        graph.add_tasks(task, other_task)
+        with pytest.raises(task_graph.TaskNotInGraphError):
+            graph.add_dependencies([(other_task, task), (task_not_in_graph, task)])
+        # no dependency is added when any of them is invalid
+        assert graph.has_dependency(other_task, task) is False
+
     def test_add_dependency_dependency_group(self, graph):
         task = MockTask()
         group_tasks = [MockTask() for _ in xrange(3)]
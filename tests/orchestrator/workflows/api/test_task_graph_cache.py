@@ -0,0 +1,125 @@
+# Licensed to the Apache Software Foundation (ASF) under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import pytest
+
+from aria.orchestrator.workflows.api import task
+from aria.orchestrator.workflows.api.task_graph_cache import TaskGraphCache
+from aria.orchestrator.workflows.core import retry
+from aria.orchestrator.workflows.builtin.install import install
+
+from tests import mock, storage
+
+
+@pytest.fixture
+def ctx(tmpdir):
+    context = mock.context.simple(str(tmpdir),
+                                  topology=mock.topology.create_simple_topology_three_nodes)
+    yield context
+    storage.release_sqlite_storage(context.model)
+
+
+class _CountingWorkflow(object):
+
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, ctx):
+        self.calls += 1
+        return task.WorkflowTask(install, ctx=ctx)
+
+
+def _structure(graph):
+    """
+    Describes a task graph by the names of its tasks and of their dependencies
+    """
+    def name(api_task):
+        return api_task.name if isinstance(api_task, task.OperationTask) else type(api_task)
+
+    result = []
+    for api_task in graph.tasks:
+        if isinstance(api_task, task.WorkflowTask):
+            result.append(('workflow', _structure(api_task)))
+        else:
+            result.append((name(api_task),
+                           sorted(str(name(dependency))
+                                  for dependency in graph.get_dependencies(api_task))))
+    return sorted(result)
+
+
+def test_cached_graph_has_the_same_structure(ctx):
+    cache = TaskGraphCache()
+    workflow = _CountingWorkflow()
+
+    built = cache.build('install', workflow, ctx)
+    restored = cache.build('install', workflow, ctx)
+
+    assert workflow.calls == 1
+    assert restored is not built
+    assert _structure(restored) == _structure(built)
+    assert set(t.id for t in restored.tasks).isdisjoint(t.id for t in built.tasks)
+
+
+def test_topology_change_invalidates_cache(ctx):
+    cache = TaskGraphCache()
+    workflow = _CountingWorkflow()
+    cache.build('install', workflow, ctx)
+
+    relationship = ctx.model.relationship.list()[0]
+    ctx.model.relationship.delete(relationship)
+    cache.build('install', workflow, ctx)
+
+    assert workflow.calls == 2
+
+
+def test_clear(ctx):
+    cache = TaskGraphCache()
+    workflow = _CountingWorkflow()
+    cache.build('install', workflow, ctx)
+    cache.clear()
+    cache.build('install', workflow, ctx)
+
+    assert workflow.calls == 2
+
+
+def test_equal_retry_policies_share_cache(ctx):
+    cache = TaskGraphCache()
+    workflow = _CountingWorkflow()
+
+    ctx._task_retry_policy = retry.ExponentialRetryPolicy(base_interval=1)
+    cache.build('install', workflow, ctx)
+    ctx._task_retry_policy = retry.ExponentialRetryPolicy(base_interval=1)
+    cache.build('install', workflow, ctx)
+    assert workflow.calls == 1
+
+    ctx._task_retry_policy = retry.ExponentialRetryPolicy(base_interval=2)
+    cache.build('install', workflow, ctx)
+    assert workflow.calls == 2
+
+
+def test_least_recently_used_graph_is_evicted(ctx):
+    cache = TaskGraphCache(max_size=2)
+    workflows = dict((name, _CountingWorkflow()) for name in ('a', 'b', 'c'))
+
+    cache.build('a', workflows['a'], ctx)
+    cache.build('b', workflows['b'], ctx)
+    cache.build('a', workflows['a'], ctx)
+    cache.build('c', workflows['c'], ctx)
+    cache.build('a', workflows['a'], ctx)
+    cache.build('b', workflows['b'], ctx)
+
+    assert workflows['a'].calls == 1
+    assert workflows['b'].calls == 2
+    assert workflows['c'].calls == 1
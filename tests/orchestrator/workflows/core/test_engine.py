@@ -28,7 +28,7 @@ from aria.orchestrator.workflows import (
     api,
     exceptions,
 )
-from aria.orchestrator.workflows.core import engine
+from aria.orchestrator.workflows.core import engine, retry, scheduler
 from aria.orchestrator.workflows.executor import thread
 
 from tests import mock, storage
@@ -60,7 +60,8 @@ class BaseTest(object):
             inputs=None,
             max_attempts=None,
             retry_interval=None,
-            ignore_failure=None):
+            ignore_failure=None,
+            retry_policy=None):
         node = ctx.model.node.get_by_name(mock.models.DEPENDENCY_NODE_NAME)
         interface_name = 'aria.interfaces.lifecycle'
         operation_kwargs = dict(implementation='{name}.{func.__name__}'.format(
@@ -81,6 +82,7 @@ class BaseTest(object):
             max_attempts=max_attempts,
             retry_interval=retry_interval,
             ignore_failure=ignore_failure,
+            retry_policy=retry_policy,
         )
 
     @pytest.fixture(autouse=True)
@@ -220,6 +222,79 @@ class TestEngine(BaseTest):
         assert global_test_holder.get('invocations') == [1, 2]
         assert global_test_holder.get('sent_task_signal_calls') == 2
 
+    def test_engine_waits_for_task_events(self, workflow_context, executor, mocker):
+        @workflow
+        def mock_workflow(ctx, graph):
+            graph.add_tasks(self._op(ctx, func=mock_sleep_task, inputs=dict(seconds=2)))
+        eng = self._engine(workflow_func=mock_workflow,
+                           workflow_context=workflow_context,
+                           executor=executor)
+        ended_tasks = mocker.spy(eng, '_ended_tasks')
+        eng.execute()
+        assert workflow_context.states == ['start', 'success']
+        # a polling engine would have examined the graph every 100 ms while the task was sleeping
+        assert ended_tasks.call_count < 10
+
+
+    @pytest.mark.parametrize('interrupted_status', ['started', 'failed'])
+    def test_resume_interrupted_execution(self, workflow_context, executor, interrupted_status):
+        @workflow
+        def mock_workflow(ctx, graph):
+            op1 = self._op(ctx, func=mock_ordered_task, inputs={'counter': 1})
+            op2 = self._op(ctx, func=mock_ordered_task, inputs={'counter': 2})
+            graph.sequence(op1, op2)
+        # the first run stores the tasks, and is interrupted after the first task succeeded and
+        # while the second one was running (or after it failed)
+        self._engine(workflow_func=mock_workflow,
+                     workflow_context=workflow_context,
+                     executor=executor)
+        for task_model in workflow_context.model.task.list():
+            first_task = task_model.inputs['counter'].value == 1
+            task_model.status = task_model.SUCCESS if first_task else interrupted_status
+            workflow_context.model.task.update(task_model)
+
+        eng = engine.Engine(executor=executor,
+                            workflow_context=workflow_context,
+                            tasks_graph=mock_workflow(ctx=workflow_context),
+                            resume=True)
+        eng.execute()
+        assert workflow_context.states == ['start', 'success']
+        assert global_test_holder.get('invocations') == [2]
+        assert len(workflow_context.model.task.list()) == 2
+
+
+class TestSimulation(BaseTest):
+
+    @staticmethod
+    def _mock_workflow(test):
+        @workflow
+        def mock_workflow(ctx, graph):
+            op1, op2, op3 = [test._op(ctx, func=mock_success_task) for _ in range(3)]
+            graph.sequence(op1, op2)
+            graph.add_tasks(op3)
+        return mock_workflow
+
+    def test_simulation(self, workflow_context, executor):
+        eng = self._engine(workflow_func=self._mock_workflow(self),
+                           workflow_context=workflow_context,
+                           executor=executor)
+        result = eng.simulate(durations={('aria.interfaces.lifecycle', 'create'): 2})
+        assert result.makespan == 4
+        assert result.concurrency_peak == 2
+        assert len(result.critical_path) == 2
+        # nothing was executed
+        assert global_test_holder.get('sent_task_signal_calls') is None
+
+    def test_simulation_with_concurrency_limits(self, workflow_context, executor):
+        eng = self._engine(workflow_func=self._mock_workflow(self),
+                           workflow_context=workflow_context,
+                           executor=executor)
+        result = eng.simulate(durations={('aria.interfaces.lifecycle', 'create'): [2]},
+                              concurrency_limits=scheduler.ConcurrencyLimits(max_tasks=1))
+        assert result.makespan == 6
+        assert result.concurrency_peak == 1
+        assert len(result.critical_path) == 3
+
 
 class TestCancel(BaseTest):
 
@@ -377,6 +452,44 @@ class TestRetries(BaseTest):
         assert invocation2 - invocation1 >= retry_interval
         assert global_test_holder.get('sent_task_signal_calls') == 2
 
+    def test_retry_policy(self, workflow_context, executor):
+        @workflow
+        def mock_workflow(ctx, graph):
+            op = self._op(ctx, func=mock_conditional_failure_task,
+                          inputs={'failure_count': 2},
+                          max_attempts=3,
+                          retry_interval=100,
+                          retry_policy=retry.ExponentialRetryPolicy(base_interval=0.1))
+            graph.add_tasks(op)
+        self._execute(
+            workflow_func=mock_workflow,
+            workflow_context=workflow_context,
+            executor=executor)
+        assert workflow_context.states == ['start', 'success']
+        invocation1, invocation2, invocation3 = global_test_holder.get('invocations', [])
+        assert invocation2 - invocation1 >= 0.1
+        assert invocation3 - invocation2 >= 0.2
+        # the policy overrides the retry interval of the task
+        assert invocation3 - invocation1 < 100
+
+    def test_retry_budget(self, workflow_context, executor):
+        workflow_context._task_retry_budget = retry.RetryBudget(max_retries=1)
+
+        @workflow
+        def mock_workflow(ctx, graph):
+            op = self._op(ctx, func=mock_conditional_failure_task,
+                          inputs={'failure_count': 2},
+                          max_attempts=3)
+            graph.add_tasks(op)
+        with pytest.raises(exceptions.ExecutorException):
+            self._execute(
+                workflow_func=mock_workflow,
+                workflow_context=workflow_context,
+                executor=executor)
+        assert workflow_context.states == ['start', 'failure']
+        assert len(global_test_holder.get('invocations', [])) == 2
+        assert workflow_context._task_retry_budget.remaining == 0
+
     def test_ignore_failure(self, workflow_context, executor):
         @workflow
         def mock_workflow(ctx, graph):
@@ -0,0 +1,65 @@
+# Licensed to the Apache Software Foundation (ASF) under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from aria.orchestrator.workflows.core import retry
+
+
+def test_fixed_retry_policy():
+    policy = retry.FixedRetryPolicy(retry_interval=5)
+    assert [policy.interval(attempt) for attempt in range(1, 4)] == [5, 5, 5]
+
+
+def test_exponential_retry_policy():
+    policy = retry.ExponentialRetryPolicy(base_interval=1, factor=2, max_interval=10)
+    assert [policy.interval(attempt) for attempt in range(1, 7)] == [1, 2, 4, 8, 10, 10]
+
+
+def test_exponential_retry_policy_after_many_retries():
+    policy = retry.ExponentialRetryPolicy(base_interval=1.5, factor=2, max_interval=10)
+    assert policy.interval(10 ** 6) == 10
+
+
+def test_exponential_retry_policy_with_jitter():
+    policy = retry.ExponentialRetryPolicy(base_interval=1, factor=2, max_interval=10, jitter=True)
+    for attempt in range(1, 7):
+        assert 0 <= policy.interval(attempt) <= min(2 ** (attempt - 1), 10)
+
+
+def test_decorrelated_jitter_retry_policy():
+    policy = retry.DecorrelatedJitterRetryPolicy(base_interval=1, max_interval=20)
+    interval = None
+    for attempt in range(1, 20):
+        previous_interval = interval
+        interval = policy.interval(attempt, previous_interval)
+        assert 1 <= interval <= min((previous_interval or 1) * 3, 20)
+
+
+def test_retry_budget():
+    budget = retry.RetryBudget(max_retries=2)
+    assert budget.consume()
+    assert budget.consume()
+    assert not budget.consume()
+    assert budget.remaining == 0
+
+
+def test_policies_compare_by_value():
+    assert retry.ExponentialRetryPolicy(base_interval=1) == \
+        retry.ExponentialRetryPolicy(base_interval=1)
+    assert hash(retry.ExponentialRetryPolicy(base_interval=1)) == \
+        hash(retry.ExponentialRetryPolicy(base_interval=1))
+    assert retry.ExponentialRetryPolicy(base_interval=1) != \
+        retry.ExponentialRetryPolicy(base_interval=2)
+    assert retry.FixedRetryPolicy(retry_interval=1) != \
+        retry.DecorrelatedJitterRetryPolicy(base_interval=1, max_interval=1)
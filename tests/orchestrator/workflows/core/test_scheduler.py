@@ -0,0 +1,121 @@
+# Licensed to the Apache Software Foundation (ASF) under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from datetime import datetime, timedelta
+
+import networkx
+import pytest
+
+from aria.orchestrator.workflows.core import scheduler
+
+
+class MockTask(object):
+
+    def __init__(self, id):
+        self.id = id
+        self.due_at = datetime.utcnow()
+
+
+@pytest.fixture
+def graph():
+    # a -> b -> d
+    # a -> c -> d
+    execution_graph = networkx.DiGraph()
+    for task_id in 'abcd':
+        execution_graph.add_node(task_id, task=MockTask(task_id))
+    execution_graph.add_edges_from([('a', 'b'), ('a', 'c'), ('b', 'd'), ('c', 'd')])
+    return execution_graph
+
+
+def _ids(tasks):
+    return sorted(task.id for task in tasks)
+
+
+def test_dependents_are_released_once_all_dependencies_end(graph):
+    tasks_scheduler = scheduler.Scheduler(graph)
+    a, = tasks_scheduler.ready_tasks()
+    assert a.id == 'a'
+    assert list(tasks_scheduler.ready_tasks()) == []
+
+    tasks_scheduler.task_ended(a)
+    b, c = sorted(tasks_scheduler.ready_tasks(), key=lambda task: task.id)
+    assert _ids(tasks_scheduler.in_flight_tasks) == ['b', 'c']
+
+    tasks_scheduler.task_ended(b)
+    assert list(tasks_scheduler.ready_tasks()) == []
+    tasks_scheduler.task_ended(c)
+    d, = tasks_scheduler.ready_tasks()
+    assert d.id == 'd'
+
+    assert not tasks_scheduler.all_tasks_consumed()
+    tasks_scheduler.task_ended(d)
+    assert tasks_scheduler.all_tasks_consumed()
+    assert tasks_scheduler.in_flight_tasks == []
+
+
+def test_retrying_tasks_are_ready_when_due(graph):
+    tasks_scheduler = scheduler.Scheduler(graph)
+    a, = tasks_scheduler.ready_tasks()
+    a.due_at = datetime.utcnow() + timedelta(seconds=10)
+    tasks_scheduler.task_retrying(a)
+
+    assert tasks_scheduler.next_due_at == a.due_at
+    assert list(tasks_scheduler.ready_tasks()) == []
+    assert list(tasks_scheduler.ready_tasks(now=a.due_at)) == [a]
+    assert tasks_scheduler.next_due_at is None
+
+
+class MockOperationTask(MockTask):
+
+    def __init__(self, id, plugin_fk=None):
+        super(MockOperationTask, self).__init__(id)
+        self.implementation = 'mock.implementation'
+        self.plugin_fk = plugin_fk
+
+
+def test_concurrency_limits_throttle_ready_tasks():
+    # a, b and c are independent, a and b belong to the same plugin
+    execution_graph = networkx.DiGraph()
+    execution_graph.add_node('a', task=MockOperationTask('a', plugin_fk=1))
+    execution_graph.add_node('b', task=MockOperationTask('b', plugin_fk=1))
+    execution_graph.add_node('c', task=MockOperationTask('c', plugin_fk=2))
+    execution_graph.add_node('stub', task=MockTask('stub'))
+    limits = scheduler.ConcurrencyLimits(max_tasks=2, max_tasks_per_plugin=1)
+    tasks_scheduler = scheduler.Scheduler(execution_graph, limits=limits)
+
+    first_tasks = list(tasks_scheduler.ready_tasks())
+    # tasks without an implementation are not limited
+    assert 'stub' in _ids(first_tasks)
+    assert len([task for task in first_tasks if task.id != 'stub']) == 2
+    assert limits.saturated
+    assert list(tasks_scheduler.ready_tasks()) == []
+
+    for task in first_tasks:
+        tasks_scheduler.task_ended(task)
+    assert not limits.saturated
+    last_task, = tasks_scheduler.ready_tasks()
+    assert _ids(first_tasks + [last_task]) == ['a', 'b', 'c', 'stub']
+
+
+def test_ready_tasks_are_ordered_by_critical_path():
+    # short, long -> tail
+    execution_graph = networkx.DiGraph()
+    for task_id in ('short', 'long', 'tail'):
+        execution_graph.add_node(task_id, task=MockTask(task_id))
+    execution_graph.add_edge('long', 'tail')
+    tasks_scheduler = scheduler.Scheduler(execution_graph,
+                                          weights={'short': 5, 'long': 2, 'tail': 10})
+
+    assert [task.id for task in tasks_scheduler.ready_tasks()] == ['long', 'short']
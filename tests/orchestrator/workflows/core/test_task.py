@@ -154,3 +154,37 @@ class TestOperationTask(object):
         assert core_task.ended_at == future_time
         assert core_task.attempts_count == 2
         assert core_task.due_at == future_time
+
+    def test_operation_task_state_is_written_on_flush(self, ctx):
+        node = ctx.model.node.get_by_name(mock.models.DEPENDENCY_NODE_NAME)
+
+        _, core_task = self._create_node_operation_task(ctx, node)
+        with core_task._update():
+            core_task.status = core_task.STARTED
+            core_task.attempts_count = 2
+
+        assert core_task.status == core_task.STARTED
+        assert ctx.model.task.get(core_task.model_task.id).status == core_task.PENDING
+
+        core_task.flush()
+        storage_task = ctx.model.task.get(core_task.model_task.id)
+        assert storage_task.status == core_task.STARTED
+        assert storage_task.attempts_count == 2
+
+        core_task.flush(write_behind=False)
+        with core_task._update():
+            core_task.status = core_task.SUCCESS
+        assert ctx.model.task.get(core_task.model_task.id).status == core_task.SUCCESS
+
+    def test_node_state_is_written_with_task_state(self, ctx):
+        node = ctx.model.node.get_by_name(mock.models.DEPENDENCY_NODE_NAME)
+
+        _, core_task = self._create_node_operation_task(ctx, node)
+        with core_task._update():
+            core_task.status = core_task.STARTED
+            core_task.node_state = node.CREATING
+
+        # node state changes are not held back for the next flush
+        storage_task = ctx.model.task.get(core_task.model_task.id)
+        assert storage_task.status == core_task.STARTED
+        assert storage_task.node.state == node.CREATING
@@ -23,7 +23,7 @@ from tests import mock
 from tests import storage
 
 
-def test_task_graph_into_execution_graph(tmpdir):
+def test_task_graph_into_execution_graph(tmpdir, mocker):
     interface_name = 'Standard'
     operation_name = 'create'
     task_context = mock.context.simple(str(tmpdir))
@@ -66,11 +66,16 @@ def test_task_graph_into_execution_graph(tmpdir):
 
     # Direct check
     execution_graph = DiGraph()
+    put_all = mocker.spy(task_context.model.task, 'put_all')
     core.translation.build_execution_graph(task_graph=test_task_graph,
                                            execution_graph=execution_graph,
                                            default_executor=base.StubTaskExecutor())
     execution_tasks = topological_sort(execution_graph)
 
+    # All task models are stored at once
+    assert put_all.call_count == 1
+    assert len(task_context.model.task.list()) == 3
+
     assert len(execution_tasks) == 7
 
     expected_tasks_names = [
@@ -29,6 +29,7 @@ class MockTask(object):
         self.implementation = self.name = implementation
         self.plugin_fk = plugin.id if plugin else None
         self.plugin = plugin or None
+        self.node_fk = None
         self.inputs = inputs or {}
         self.states = []
         self.exception = None
@@ -0,0 +1,161 @@
+# Licensed to the Apache Software Foundation (ASF) under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import Queue
+from collections import namedtuple
+
+import pytest
+
+from aria.orchestrator import events
+from aria.orchestrator.workflows.executor import celery
+
+from . import MockTask
+
+# celery.contrib.testing was added in Celery 4.0
+_celery = pytest.importorskip('celery', minversion='4.0')
+from celery.contrib.testing import worker as celery_worker  # pylint: disable=wrong-import-position
+
+
+class TestCeleryExecutor(object):
+
+    def test_execute(self, executor, events_queue):
+        successful_task = _task(mock_successful_operation, value='value')
+        failing_task = _task(mock_failing_operation)
+        executor.execute(successful_task)
+        executor.execute(failing_task)
+
+        reports = dict((events_queue.get(timeout=30), events_queue.get(timeout=30))
+                       for _ in range(2))
+        assert reports[successful_task.id] is None
+        assert isinstance(reports[failing_task.id], Exception)
+        assert received_contexts == [{'task_id': successful_task.id, 'actor_id': 'actor'}]
+
+    def test_context_is_serialized_without_storage(self):
+        context = MockContext(model_storage=object(), task_id='task', actor_id='actor')
+        serialized = celery._serialize_context(context)
+        assert serialized == {
+            'context_cls': '{0}.{1}'.format(__name__, MockContext.__name__),
+            'context': {'task_id': 'task', 'actor_id': 'actor'}
+        }
+
+    @pytest.mark.parametrize('routing, expected_queue', [
+        (None, None),
+        (celery.ROUTE_BY_PLUGIN, 'aria.plugin.mock-plugin'),
+        (celery.ROUTE_BY_HOST, 'aria.host.7'),
+        (lambda task: 'custom', 'custom'),
+    ])
+    def test_routing(self, app, routing, expected_queue):
+        executor = celery.CeleryExecutor(app, routing=routing)
+        try:
+            task = MockTask('implementation', plugin=MockPlugin(id=1, name='mock-plugin'))
+            task.host_fk = 7
+            assert executor._get_queue(task) == expected_queue
+        finally:
+            executor.close()
+
+
+    def test_states_are_fetched_together(self, app):
+        executor = celery.CeleryExecutor(app)
+        try:
+            results = [app.AsyncResult(task_id) for task_id in ('a', 'b', 'c')]
+            app.backend.store_result('a', 'value', 'SUCCESS')
+            app.backend.store_result('b', None, 'STARTED')
+            backend_mget = app.backend.mget
+            mget_calls = []
+
+            def mget(keys):
+                mget_calls.append(keys)
+                return backend_mget(keys)
+            app.backend.mget = mget
+
+            assert executor._fetch_states(results) == {'a': 'SUCCESS',
+                                                       'b': 'STARTED',
+                                                       'c': 'PENDING'}
+            assert len(mget_calls) == 1
+        finally:
+            executor.close()
+
+
+MockPlugin = namedtuple('MockPlugin', 'id, name')
+
+received_contexts = []
+
+
+class MockContext(object):
+
+    def __init__(self, model_storage=None, resource_storage=None, **ids):
+        self.model = model_storage
+        self.ids = ids
+
+    @property
+    def serialization_dict(self):
+        context = dict(self.ids, model_storage={}, resource_storage=None)
+        return {'context_cls': self.__class__, 'context': context}
+
+
+def mock_successful_operation(ctx, value, **_):
+    assert value == 'value'
+    received_contexts.append(ctx.ids)
+
+
+def mock_failing_operation(**_):
+    raise RuntimeError
+
+
+def _task(func, **inputs):
+    task = MockTask('{0}.{1}'.format(__name__, func.__name__))
+    task.inputs = dict((name, MockInput(name, value)) for name, value in inputs.items())
+    task.context = MockContext(task_id=task.id, actor_id='actor')
+    return task
+
+
+class MockInput(namedtuple('MockInput', 'name, value')):
+    def unwrap(self):
+        return self.name, self.value
+
+
+@pytest.fixture
+def app():
+    result = _celery.Celery(broker='memory://', backend='cache+memory://')
+    celery.register_operation_task(result, model_storage=None)
+    return result
+
+
+@pytest.fixture
+def executor(app):
+    del received_contexts[:]
+    with celery_worker.start_worker(app, perform_ping_check=False):
+        result = celery.CeleryExecutor(app, poll_interval=0.1)
+        yield result
+        result.close()
+
+
+@pytest.fixture
+def events_queue():
+    queue = Queue.Queue()
+
+    def success_handler(task, **kwargs):
+        queue.put(task.id)
+        queue.put(None)
+
+    def failure_handler(task, exception, **kwargs):
+        queue.put(task.id)
+        queue.put(exception)
+
+    events.on_success_task_signal.connect(success_handler)
+    events.on_failure_task_signal.connect(failure_handler)
+    yield queue
+    events.on_success_task_signal.disconnect(success_handler)
+    events.on_failure_task_signal.disconnect(failure_handler)
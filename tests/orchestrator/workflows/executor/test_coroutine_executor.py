@@ -0,0 +1,169 @@
+# Licensed to the Apache Software Foundation (ASF) under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import select
+import socket
+import time
+import Queue
+
+import pytest
+
+from aria.modeling import models
+from aria.orchestrator import events, exceptions
+from aria.orchestrator.workflows.executor import coroutine
+
+from . import MockTask
+
+
+class TestCoroutineExecutor(object):
+
+    def test_coroutines_run_concurrently(self, executor, events_queue):
+        tasks = [MockTask(_get_implementation(mock_sleep_operation),
+                          inputs={'seconds': models.Parameter.wrap('seconds', 0.5)})
+                 for _ in range(10)]
+        start = time.time()
+        for task in tasks:
+            executor.execute(task)
+        for _ in tasks:
+            task, exception = events_queue.get(timeout=10)
+            assert exception is None
+        assert time.time() - start < 2
+
+    def test_nested_coroutine_result(self, executor, events_queue):
+        task = MockTask(_get_implementation(mock_nested_operation))
+        executor.execute(task)
+        _, exception = events_queue.get(timeout=10)
+        assert exception is None
+        assert nested_results == ['result']
+
+    def test_wait_for_socket(self, executor, events_queue):
+        reader, writer = coroutine._socket_pair()
+        try:
+            task = MockTask(_get_implementation(mock_read_operation),
+                            inputs={'fileno': models.Parameter.wrap('fileno', reader.fileno())})
+            executor.execute(task)
+            time.sleep(0.2)
+            assert events_queue.empty()
+            writer.send(b'data')
+            _, exception = events_queue.get(timeout=10)
+            assert exception is None
+        finally:
+            reader.close()
+            writer.close()
+
+    def test_several_waiters_for_socket(self, executor, events_queue):
+        reader, writer = coroutine._socket_pair()
+        try:
+            tasks = [MockTask(_get_implementation(mock_read_operation),
+                              inputs={'fileno': models.Parameter.wrap('fileno', reader.fileno())})
+                     for _ in range(2)]
+            for task in tasks:
+                executor.execute(task)
+            time.sleep(0.2)
+            assert events_queue.empty()
+            writer.send(b'datadata')
+            for _ in tasks:
+                _, exception = events_queue.get(timeout=10)
+                assert exception is None
+        finally:
+            reader.close()
+            writer.close()
+
+    def test_failing_coroutine(self, executor, events_queue):
+        task = MockTask(_get_implementation(mock_failing_operation))
+        executor.execute(task)
+        _, exception = events_queue.get(timeout=10)
+        assert isinstance(exception, MockException)
+
+    def test_terminate(self, executor, events_queue):
+        task = MockTask(_get_implementation(mock_sleep_operation),
+                        inputs={'seconds': models.Parameter.wrap('seconds', 60)})
+        executor.execute(task)
+        executor.terminate(task)
+        _, exception = events_queue.get(timeout=10)
+        assert isinstance(exception, exceptions.TaskAbortException)
+
+    def test_close_is_prompt(self, executor):
+        start = time.time()
+        executor.close()
+        assert time.time() - start < 0.5
+
+
+nested_results = []
+
+
+def _get_implementation(func):
+    return '{module}.{func.__name__}'.format(module=__name__, func=func)
+
+
+def mock_sleep_operation(seconds, **_):
+    yield coroutine.Sleep(seconds)
+
+
+def mock_nested_operation(**_):
+    del nested_results[:]
+    result = yield _mock_nested_coroutine()
+    nested_results.append(result)
+
+
+def _mock_nested_coroutine():
+    yield coroutine.Sleep(0)
+    raise coroutine.Return('result')
+
+
+def mock_read_operation(fileno, **_):
+    yield coroutine.Readable(fileno)
+    sock = socket.fromfd(fileno, socket.AF_INET, socket.SOCK_STREAM)
+    try:
+        assert sock.recv(4) == b'data'
+    finally:
+        sock.close()
+
+
+def mock_failing_operation(**_):
+    yield coroutine.Sleep(0)
+    raise MockException
+
+
+class MockException(Exception):
+    pass
+
+
+@pytest.fixture(params=['poll', 'select'])
+def executor(request, monkeypatch):
+    if request.param == 'poll' and not hasattr(select, 'poll'):
+        pytest.skip('poll is not available')
+    if request.param == 'select':
+        monkeypatch.delattr(select, 'poll', raising=False)
+    result = coroutine.CoroutineExecutor()
+    yield result
+    result.close()
+
+
+@pytest.fixture
+def events_queue():
+    queue = Queue.Queue()
+
+    def success_handler(task, **kwargs):
+        queue.put((task, None))
+
+    def failure_handler(task, exception, **kwargs):
+        queue.put((task, exception))
+
+    events.on_success_task_signal.connect(success_handler)
+    events.on_failure_task_signal.connect(failure_handler)
+    yield queue
+    events.on_success_task_signal.disconnect(success_handler)
+    events.on_failure_task_signal.disconnect(failure_handler)
@@ -29,6 +29,7 @@ import aria
 from aria.modeling import models
 from aria.orchestrator import events
 from aria.orchestrator.workflows.executor import (
+    coroutine,
     thread,
     process,
     # celery
@@ -104,6 +105,7 @@ def storage(tmpdir):
 @pytest.fixture(params=[
     (thread.ThreadExecutor, {'pool_size': 1}),
     (thread.ThreadExecutor, {'pool_size': 2}),
+    (coroutine.CoroutineExecutor, {}),
     # subprocess needs to load a tests module so we explicitly add the root directory as if
     # the project has been installed in editable mode
     # (celery.CeleryExecutor, {'app': app})
@@ -115,9 +117,14 @@ def thread_executor(request):
     result.close()
 
 
-@pytest.fixture
-def process_executor():
-    result = process.ProcessExecutor(python_path=tests.ROOT_DIR)
+@pytest.fixture(params=[
+    {},
+    {'pool_size': 1},
+    {'pool_size': 2},
+    {'codec': 'jsonpickle'},
+])
+def process_executor(request):
+    result = process.ProcessExecutor(python_path=tests.ROOT_DIR, **request.param)
     yield result
     result.close()
 
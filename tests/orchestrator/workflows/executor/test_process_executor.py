@@ -14,15 +14,18 @@
 # limitations under the License.
 
 import os
+import time
 import Queue
 
 import pytest
 
 import aria
-from aria.orchestrator import events
+from aria.orchestrator import events, exceptions
 from aria.utils.plugin import create as create_plugin
 from aria.orchestrator.workflows.executor import process
+from aria.storage import instrumentation
 
+import tests
 import tests.storage
 import tests.resources
 from tests.fixtures import (  # pylint: disable=unused-import
@@ -63,6 +66,76 @@ class TestProcessExecutor(object):
             events.on_success_task_signal.disconnect(handler)
             events.on_failure_task_signal.disconnect(handler)
 
+    def test_pooled_workers_are_reused(self, pooled_executor, storage):
+        tasks = [MockTask('{0}.{1}'.format(__name__, mock_operation.__name__), storage=storage)
+                 for _ in range(3)]
+        queue = Queue.Queue()
+
+        def handler(task, **kwargs):
+            queue.put(task)
+
+        events.on_success_task_signal.connect(handler)
+        try:
+            for task in tasks:
+                pooled_executor.execute(task)
+            for _ in tasks:
+                queue.get(timeout=60)
+            # the pool of tasks without a plugin
+            assert len(pooled_executor._workers[None]) == 1
+        finally:
+            events.on_success_task_signal.disconnect(handler)
+
+    def test_channel_serves_multiple_requests(self, executor):
+        channel = process._Channel(port=executor._server_port, codec=executor._codec)
+        try:
+            for request_id in range(3):
+                response = channel.request({'type': 'unknown', 'task_id': None})
+                assert response['request_id'] == request_id
+                assert isinstance(response['exception'], RuntimeError)
+        finally:
+            channel.close()
+
+    @pytest.mark.parametrize('codec_name', sorted(process.CODECS))
+    def test_codec_round_trip(self, codec_name):
+        codec = process.CODECS[codec_name]
+        message = {
+            'type': 'succeeded',
+            'task_id': 1,
+            # JSON based codecs turn the instance ids into strings, which applying the tracked
+            # changes accepts as well
+            'tracked_changes': {
+                'node': {'1': {'attributes': instrumentation._Value({}, {'a': 1})}}
+            },
+            'new_instances': {}
+        }
+        assert codec.loads(codec.dumps(message)) == message
+
+    @pytest.mark.parametrize('pool_size', [None, 1])
+    def test_terminate(self, storage, pool_size):
+        executor = process.ProcessExecutor(python_path=[tests.ROOT_DIR],
+                                           pool_size=pool_size,
+                                           termination_grace_period=1)
+        task = MockTask('{0}.{1}'.format(__name__, mock_sleep_operation.__name__), storage=storage)
+        queue = Queue.Queue()
+
+        def handler(_, exception=None, **kwargs):
+            queue.put(exception)
+
+        events.start_task_signal.connect(handler)
+        events.on_success_task_signal.connect(handler)
+        events.on_failure_task_signal.connect(handler)
+        try:
+            executor.execute(task)
+            # wait for the task to start
+            queue.get(timeout=60)
+            executor.terminate(task)
+            assert isinstance(queue.get(timeout=10), exceptions.TaskAbortException)
+        finally:
+            events.start_task_signal.disconnect(handler)
+            events.on_success_task_signal.disconnect(handler)
+            events.on_failure_task_signal.disconnect(handler)
+            executor.close()
+
     def test_closed(self, executor):
         executor.close()
         with pytest.raises(RuntimeError) as exc_info:
@@ -77,6 +150,21 @@ def executor(plugin_manager):
     result.close()
 
 
+@pytest.fixture
+def pooled_executor():
+    result = process.ProcessExecutor(python_path=[tests.ROOT_DIR], pool_size=1)
+    yield result
+    result.close()
+
+
+def mock_operation(**_):
+    pass
+
+
+def mock_sleep_operation(**_):
+    time.sleep(60)
+
+
 @pytest.fixture
 def mock_plugin(plugin_manager, tmpdir):
     source = os.path.join(tests.resources.DIR, 'plugins', 'mock-plugin1')
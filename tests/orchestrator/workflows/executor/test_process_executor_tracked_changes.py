@@ -14,6 +14,8 @@
 # limitations under the License.
 
 import copy
+import os
+import uuid
 
 import pytest
 
@@ -44,6 +46,37 @@ def test_track_changes_of_failed_operation(context, executor):
     _assert_tracked_changes_are_applied(context)
 
 
+def test_pooled_worker_reuses_storage(context):
+    @workflow
+    def mock_workflow(ctx, graph):
+        node = ctx.model.node.get_by_name(mock.models.DEPENDENCY_NODE_NAME)
+        interface = mock.models.create_interface(
+            ctx.service,
+            'test_interface',
+            'operation',
+            operation_kwargs=dict(implementation=_operation_mapping(_mock_storage_operation))
+        )
+        node.interfaces[interface.name] = interface
+        graph.sequence(*[api.task.OperationTask(node,
+                                                interface_name='test_interface',
+                                                operation_name='operation')
+                         for _ in range(2)])
+        return graph
+
+    pooled_executor = process.ProcessExecutor(python_path=[tests.ROOT_DIR], pool_size=1)
+    try:
+        graph = mock_workflow(ctx=context)  # pylint: disable=no-value-for-parameter
+        engine.Engine(executor=pooled_executor, workflow_context=context,
+                      tasks_graph=graph).execute()
+    finally:
+        pooled_executor.close()
+    out = context.model.node.get_by_name(
+        mock.models.DEPENDENCY_NODE_NAME).runtime_properties['out']
+    # The second task of the worker reads the changes of the first one through the same storage
+    assert len(out) == 2
+    assert out[0] == out[1]
+
+
 def _assert_tracked_changes_are_applied(context):
     instance = context.model.node.get_by_name(mock.models.DEPENDENCY_NODE_NAME)
     assert instance.runtime_properties == _TEST_RUNTIME_PROPERTIES
@@ -147,13 +180,22 @@ def _mock_updating_operation(ctx, committed, changed_but_refreshed):
     ctx.node.runtime_properties['out'] = out
 
 
+@operation
+def _mock_storage_operation(ctx):
+    # Marks the storage, as the ids of objects may be reused once they are released
+    if not hasattr(ctx.model, 'test_marker'):
+        ctx.model.test_marker = str(uuid.uuid4())
+    out = ctx.node.runtime_properties.get('out', [])
+    ctx.node.runtime_properties['out'] = out + [[os.getpid(), ctx.model.test_marker]]
+
+
 def _operation_mapping(func):
     return '{name}.{func.__name__}'.format(name=__name__, func=func)
 
 
-@pytest.fixture
-def executor():
-    result = process.ProcessExecutor(python_path=[tests.ROOT_DIR])
+@pytest.fixture(params=[None, 1], ids=['subprocess_per_task', 'pooled'])
+def executor(request):
+    result = process.ProcessExecutor(python_path=[tests.ROOT_DIR], pool_size=request.param)
     yield result
     result.close()
 
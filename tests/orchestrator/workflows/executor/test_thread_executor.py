@@ -0,0 +1,145 @@
+# Licensed to the Apache Software Foundation (ASF) under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import sys
+import time
+import Queue
+from collections import namedtuple
+
+import pytest
+
+import aria
+from aria.orchestrator import events
+from aria.utils import process as process_utils
+from aria.utils.plugin import create as create_plugin
+from aria.orchestrator.workflows.executor import base, thread
+
+import tests.storage
+import tests.resources
+from tests.fixtures import (  # pylint: disable=unused-import
+    plugins_dir,
+    plugin_manager,
+    fs_model as model
+)
+from . import MockTask
+
+
+class TestThreadExecutor(object):
+
+    def test_plugin_execution(self, executor, mock_plugin, storage):
+        task = MockTask('mock_plugin1.operation', plugin=mock_plugin, storage=storage)
+
+        queue = Queue.Queue()
+
+        def handler(_, exception=None, **kwargs):
+            queue.put(exception)
+
+        events.on_success_task_signal.connect(handler)
+        events.on_failure_task_signal.connect(handler)
+        try:
+            executor.execute(task)
+            error = queue.get(timeout=60)
+            # The "operation" operation of mock-plugin1 calls the plugin's entry point, and raises
+            # a RuntimeError with its output (see test_process_executor.py)
+            assert isinstance(error, RuntimeError)
+            assert error.message == 'mock-plugin-output'
+        finally:
+            events.on_success_task_signal.disconnect(handler)
+            events.on_failure_task_signal.disconnect(handler)
+
+    def test_plugin_environment_is_scoped(self):
+        executor = thread.ThreadExecutor(plugin_manager=_MockPluginManager())
+        task = MockTask('{0}.{1}'.format(__name__, mock_environment_operation.__name__),
+                        plugin=_MockPlugin(id=1))
+        original_path = os.environ.get('PATH')
+
+        queue = Queue.Queue()
+
+        def handler(_, **kwargs):
+            queue.put(kwargs.get('exception'))
+
+        events.on_success_task_signal.connect(handler)
+        events.on_failure_task_signal.connect(handler)
+        try:
+            executor.execute(task)
+            assert queue.get(timeout=60) is None
+        finally:
+            events.on_success_task_signal.disconnect(handler)
+            events.on_failure_task_signal.disconnect(handler)
+            executor.close()
+
+        path, sys_path, subprocess_env = _environments.pop()
+        assert path.startswith(_MockPluginManager.BIN_DIR)
+        assert _MockPluginManager.SITE_PACKAGES_DIR in sys_path
+        # Subprocesses started meanwhile (e.g. by a ProcessExecutor) get the original environment
+        assert subprocess_env.get('PATH') == original_path
+        assert os.environ.get('PATH') == original_path
+        assert _MockPluginManager.SITE_PACKAGES_DIR not in sys.path
+
+    def test_close_is_prompt(self, executor):
+        start = time.time()
+        executor.close()
+        assert time.time() - start < 0.5
+
+
+@pytest.fixture
+def executor(plugin_manager):
+    result = thread.ThreadExecutor(pool_size=2, plugin_manager=plugin_manager)
+    yield result
+    result.close()
+
+
+@pytest.fixture
+def mock_plugin(plugin_manager, tmpdir):
+    source = os.path.join(tests.resources.DIR, 'plugins', 'mock-plugin1')
+    plugin_path = create_plugin(source=source, destination_dir=str(tmpdir))
+    return plugin_manager.install(source=plugin_path)
+
+
+@pytest.fixture
+def storage(tmpdir):
+    result = aria.application_model_storage(
+        aria.storage.sql_mapi.SQLAlchemyModelAPI,
+        initiator_kwargs=dict(base_dir=str(tmpdir))
+    )
+    yield result
+    tests.storage.release_sqlite_storage(result)
+
+
+_MockPlugin = namedtuple('_MockPlugin', 'id')
+
+
+class _MockPluginManager(object):
+
+    BIN_DIR = os.path.join(os.sep, 'mock_plugin', 'bin')
+    SITE_PACKAGES_DIR = os.path.join(os.sep, 'mock_plugin', 'site-packages')
+
+    def load_plugin(self, plugin, env):
+        process_utils.append_to_path(self.BIN_DIR, env=env)
+        process_utils.append_to_pythonpath(self.SITE_PACKAGES_DIR, env=env)
+
+    def get_plugin_pythonpath_dirs(self, plugin):
+        return [self.SITE_PACKAGES_DIR]
+
+
+# The environments seen by mock_environment_operation
+_environments = []
+
+
+def mock_environment_operation(**_):
+    _environments.append((os.environ.get('PATH'),
+                          list(sys.path),
+                          base.plugin_environment.original_environ()))
@@ -18,7 +18,9 @@ import pytest
 from sqlalchemy import (
     Column,
     Integer,
-    Text
+    Text,
+    event,
+    inspect
 )
 
 from aria import (
@@ -30,6 +32,7 @@ from aria.storage import (
     exceptions,
     sql_mapi,
 )
+from aria.utils.collections import OrderedDict
 
 from tests import (
     mock,
@@ -158,6 +161,45 @@ def test_mapi_include(context):
     assert_include(service2)
 
 
+class TestMapiLoad(object):
+
+    @pytest.fixture
+    def statements(self, context):
+        statements = []
+        event.listen(context.model.node._engine, 'before_cursor_execute',
+                     lambda conn, cursor, statement, *args: statements.append(statement))
+        context.model.node._session.expire_all()
+        return statements
+
+    def test_load(self, context, statements):
+        nodes = context.model.node.list(load={'interfaces': 'joined',
+                                              'interfaces.operations': 'subquery'})
+        assert len(statements) == 2
+        assert all(operation.name for node in nodes
+                   for interface in node.interfaces.values()
+                   for operation in interface.operations.values())
+        assert len(statements) == 2
+
+    def test_load_only(self, context, statements):
+        node = context.model.node.get_by_name(mock.models.DEPENDENT_NODE_NAME, load_only=['name'])
+        assert len(statements) == 1
+        assert 'state' in inspect(node).unloaded
+        assert node.state
+        assert len(statements) == 2
+
+    def test_refresh(self, context, statements):
+        node = context.model.node.get_by_name(mock.models.DEPENDENT_NODE_NAME,
+                                              load={'interfaces': 'lazy'})
+        context.model.node.refresh(node, load={'outbound_relationships': 'joined'})
+        assert len(statements) == 2
+        assert node.outbound_relationships
+        assert len(statements) == 2
+
+    def test_invalid_strategy(self, context):
+        with pytest.raises(exceptions.StorageError):
+            context.model.node.list(load={'interfaces': 'eager'})
+
+
 class MockModel(modeling.models.aria_declarative_base, modeling.mixins.ModelMixin): #pylint: disable=abstract-method
     __tablename__ = 'op_mock_model'
 
@@ -207,3 +249,149 @@ class TestFilterOperands(object):
     def test_eq_and_ne(self, storage):
         assert len(storage.op_mock_model.list(filters=dict(value=dict(eq=1, ne=3)))) == 1
         assert len(storage.op_mock_model.list(filters=dict(value=dict(eq=1, ne=1)))) == 0
+
+
+class TestKeysetPagination(object):
+
+    @pytest.fixture()
+    def storage(self):
+        model_storage = application_model_storage(
+            sql_mapi.SQLAlchemyModelAPI, initiator=tests_storage.init_inmemory_model_storage)
+        model_storage.register(MockModel)
+        # Repeated values require the id to break the ties between pages
+        model_storage.op_mock_model.put_all(MockModel(value=i % 3) for i in range(10))
+        yield model_storage
+        tests_storage.release_sqlite_storage(model_storage)
+
+    @staticmethod
+    def _list_pages(storage, size, **kwargs):
+        pages = []
+        cursor = None
+        while True:
+            result = storage.op_mock_model.list(pagination=dict(size=size, cursor=cursor),
+                                                **kwargs)
+            pages.append([model.id for model in result])
+            cursor = result.metadata['cursor']
+            if cursor is None:
+                return pages
+
+    def test_pages(self, storage):
+        assert self._list_pages(storage, 4) == [[1, 2, 3, 4], [5, 6, 7, 8], [9, 10]]
+
+    def test_sort(self, storage):
+        pages = self._list_pages(storage, 3, sort=dict(value='desc'))
+        expected = [model.id for model in storage.op_mock_model.list(
+            sort=OrderedDict([('value', 'desc'), ('id', 'desc')]))]
+        assert sum(pages, []) == expected
+        assert [len(page) for page in pages] == [3, 3, 3, 1]
+
+    def test_filters(self, storage):
+        assert self._list_pages(storage, 2, filters=dict(value=1)) == [[2, 5], [8]]
+
+    def test_count(self, storage):
+        result = storage.op_mock_model.list(pagination=dict(size=4, cursor=None))
+        assert result.metadata == dict(total=None, size=4, cursor=result.metadata['cursor'])
+        result = storage.op_mock_model.list(pagination=dict(size=4, cursor=None, count=True),
+                                            filters=dict(value=1))
+        assert result.metadata['total'] == 3
+        # The approximate count is the span of the ids of the results
+        result = storage.op_mock_model.list(
+            pagination=dict(size=4, cursor=None, count='approximate'), filters=dict(value=1))
+        assert result.metadata['total'] == 7
+
+    def test_invalid_cursor(self, storage):
+        with pytest.raises(exceptions.StorageError):
+            storage.op_mock_model.list(pagination=dict(size=4, cursor='invalid'))
+        cursor = storage.op_mock_model.list(pagination=dict(size=4, cursor=None)).metadata['cursor']
+        with pytest.raises(exceptions.StorageError):
+            storage.op_mock_model.list(pagination=dict(size=4, cursor=cursor),
+                                       sort=dict(value='asc'))
+
+
+def test_put_all(storage, mocker):
+    commit = mocker.spy(storage.mock_model, '_safe_commit')
+    mock_models = [tests_modeling.MockModel(value=i, name='model_{0}'.format(i))
+                   for i in range(3)]
+    assert storage.mock_model.put_all(iter(mock_models)) == mock_models
+    assert commit.call_count == 1
+    assert sorted(storage.mock_model.list(), key=lambda model: model.value) == mock_models
+
+
+def test_transaction(storage, mocker):
+    session = storage.mock_model._session
+    commit = mocker.spy(session, 'commit')
+    with storage.transaction():
+        for i in range(3):
+            mock_model = tests_modeling.MockModel(value=i, name='model_{0}'.format(i))
+            storage.mock_model.put(mock_model)
+            # flushed, so the instance is visible to queries made within the transaction
+            assert mock_model.id is not None
+        with storage.transaction():
+            storage.mock_model.delete(mock_model)
+        assert commit.call_count == 0
+    assert commit.call_count == 1
+    assert len(storage.mock_model.list()) == 2
+
+
+def test_transaction_rollback(storage):
+    with pytest.raises(RuntimeError):
+        with storage.transaction():
+            storage.mock_model.put(tests_modeling.MockModel(value=0, name='model_0'))
+            raise RuntimeError
+    assert len(storage.mock_model.list()) == 0
+    # commits are no longer deferred
+    storage.mock_model.put(tests_modeling.MockModel(value=1, name='model_1'))
+    storage.mock_model._session.rollback()
+    assert len(storage.mock_model.list()) == 1
+
+
+@pytest.mark.parametrize('pragmas, journal_mode', [(None, 'wal'), ({}, 'delete')])
+def test_sqlite_pragmas(tmpdir, pragmas, journal_mode):
+    engine = sql_mapi.init_storage(str(tmpdir), pragmas=pragmas)['engine']
+    connection = engine.connect()
+    try:
+        assert connection.execute('PRAGMA journal_mode').scalar() == journal_mode
+    finally:
+        connection.close()
+        engine.dispose()
+
+
+@pytest.mark.parametrize('model_name, kwargs, index_name', [
+    # ModelLogIterator
+    ('log', dict(filters=dict(execution_fk=1, id=dict(gt=0)), sort=OrderedDict(id='asc'),
+                 load={'task': 'joined'}),
+     'ix_log_execution_fk_id'),
+    ('task', dict(filters=dict(execution_fk=1, status='pending')), 'ix_task_execution_fk_status'),
+    ('task', dict(filters=dict(execution_fk=1)), 'ix_task_execution_fk_status'),
+    ('node', dict(filters=dict(service_fk=1)), 'ix_node_service_fk_name'),
+    ('execution', dict(filters=dict(service_fk=1)), 'ix_execution_service_fk'),
+    # get_by_name
+    ('node', dict(filters=dict(name='node')), 'ix_node_name'),
+])
+def test_query_plan_uses_index(context, model_name, kwargs, index_name):
+    model_api = getattr(context.model, model_name)
+    statement = model_api._get_query(**kwargs).with_labels().statement.compile(
+        model_api._engine, compile_kwargs={'literal_binds': True})
+    query_plan = [row[-1] for row in
+                  model_api._engine.execute('EXPLAIN QUERY PLAN {0}'.format(statement))]
+    # e.g. "SEARCH TABLE log USING INDEX ix_log_execution_fk_id (execution_fk=? AND id>?)"
+    assert any('INDEX {0} ('.format(index_name) in step for step in query_plan), query_plan
+
+
+def test_create_missing_indexes(tmpdir):
+    initiator_kwargs = dict(base_dir=str(tmpdir))
+    model_storage = application_model_storage(
+        sql_mapi.SQLAlchemyModelAPI, initiator=sql_mapi.init_storage,
+        initiator_kwargs=initiator_kwargs)
+    engine = model_storage.log._engine
+    # As created by a version which did not declare the index
+    engine.execute('DROP INDEX ix_log_execution_fk_id')
+    model_storage = application_model_storage(
+        sql_mapi.SQLAlchemyModelAPI, initiator=sql_mapi.init_storage,
+        initiator_kwargs=initiator_kwargs)
+    try:
+        assert 'ix_log_execution_fk_id' in [
+            index['name'] for index in inspect(model_storage.log._engine).get_indexes('log')]
+    finally:
+        tests_storage.release_sqlite_storage(model_storage)
+        engine.dispose()